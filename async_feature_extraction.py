@@ -0,0 +1,405 @@
+# async_feature_extraction.py
+import asyncio
+import contextvars
+import ssl
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import aiohttp
+import dns.asyncresolver
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+import deadline
+import domain_cache
+import feature_registry
+import http_client
+import instrumentation
+import script_cache
+from batch_extraction import HostGroups
+from deadline import budget
+from feature_extraction import URLFeatureExtractor, certificate_start, lookup_whois, serves_domain_certificate
+from page_stats import PageStream
+
+
+# Key under which AsyncURLFeatureExtractor stores each probe's result
+PROBE_KEYS = {'whois': 'whois', 'dns': 'dns', 'certificate': 'certificate_age', 'robots': 'robots',
+              'scripts': 'scripts'}
+
+# Threads for the CPU-bound page work (parsing and page features), which would
+# otherwise hold up every other URL's I/O on the event loop.
+PAGE_WORKERS = 4
+_page_executor = ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix='page-work')
+
+
+async def run_page_work(function, *args):
+    """
+    Runs function(*args) on the page work threads in the caller's context (so it
+    keeps the URL's deadline and trace) and returns its result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_page_executor, contextvars.copy_context().run, function, *args)
+
+
+def peer_certificate(resp):
+    """
+    Returns the certificate of the TLS connection an aiohttp response came over, or
+    None if it cannot be read; the certificate probe then makes its own handshake.
+    """
+    try:
+        transport = resp.connection.transport if resp.connection is not None else None
+        if transport is None:
+            # aiohttp releases the connection as soon as a short body has arrived with
+            # the headers, but the (private) protocol keeps its transport until closed
+            transport = getattr(getattr(resp, '_protocol', None), 'transport', None)
+        certificate = transport.get_extra_info('peercert') if transport is not None else None
+    except Exception:
+        return None
+    return certificate if isinstance(certificate, dict) else None
+
+
+async def handshake_certificate(domain, timeout=5):
+    """
+    Async counterpart of feature_extraction.peer_certificate(): returns the certificate
+    domain:443 presents in a TLS handshake.
+    """
+    context = ssl.create_default_context()
+    _, writer = await asyncio.wait_for(asyncio.open_connection(domain, 443, ssl=context, server_hostname=domain),
+                                       timeout=timeout)
+    try:
+        return writer.get_extra_info('peercert')
+    finally:
+        writer.close()
+
+
+async def fetch_response(session, url, probe='page', sink=None, **kwargs):
+    """
+    Fetches a URL with aiohttp and wraps the result in a requests.Response so the
+    feature code sees the same .text decoding, .url and raise_for_status() behaviour
+    as the synchronous extractor. The body size limit comes from http_client, and
+    a sink receives the body as it arrives and the TLS certificate is kept as
+    response.peer_certificate, as in http_client.fetch().
+    """
+    max_bytes = http_client.get_settings()['max_body_bytes']
+    with instrumentation.network(probe) as call:
+        async with session.get(url, **kwargs) as resp:
+            response = requests.models.Response()
+            response.status_code = resp.status
+            response.reason = resp.reason
+            response.headers = CaseInsensitiveDict(resp.headers)
+            response.url = str(resp.url)
+            response.encoding = get_encoding_from_headers(response.headers)
+            response.peer_certificate = peer_certificate(resp)
+            if sink is not None:
+                sink.start(response)
+            # Read at most max_bytes of the body, like http_client.fetch().
+            chunks = []
+            received = 0
+            async for chunk in resp.content.iter_chunked(http_client.CHUNK_SIZE):
+                chunk = chunk[:max_bytes - received]
+                received += len(chunk)
+                if sink is not None:
+                    await run_page_work(sink.feed, chunk)
+                else:
+                    chunks.append(chunk)
+                if received >= max_bytes:
+                    break
+            response._content = b''.join(chunks)
+            call.bytes = received
+        return response
+
+
+async def gather_probes(coroutines):
+    """
+    Runs probes concurrently like asyncio.gather(). Under a deadline, probes still
+    running when it passes are cancelled and the extraction goes on without them.
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    if not tasks:
+        return
+    done, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
+    for task in pending:
+        task.cancel()
+    if pending:
+        deadline.current().expire()
+    for task in done:
+        error = task.exception()
+        if error is not None and not isinstance(error, deadline.DeadlineExceeded):
+            raise error
+
+
+async def cached_probe(kind, domain, probe):
+    """
+    Async counterpart of DomainCache.lookup(): awaits probe() only on a cache miss.
+    """
+    cache = domain_cache.get_cache()
+    hit, value = cache.get(kind, domain)
+    if hit or cache.offline:
+        return value
+    value = await probe()
+    if not deadline.expired():
+        cache.put(kind, domain, value)
+    return value
+
+
+class AsyncURLFeatureExtractor(URLFeatureExtractor):
+    """
+    URLFeatureExtractor whose network probes run as coroutines.
+
+    The page fetch, DNS, WHOIS, TLS and robots.txt probes for a URL are gathered
+    concurrently; the external scripts are fetched concurrently once the page is
+    parsed. The results are then fed to the unchanged synchronous feature code, so
+    feature names and values match URLFeatureExtractor.
+    """
+
+    def __init__(self, url, host_features=None, defer_spelling=False):
+        self._probes = {}
+        super().__init__(url, host_features=host_features, defer_spelling=defer_spelling)
+
+    async def host_probe(self, name, probe):
+        """
+        Awaits probe() once per host: URLs sharing this extractor's HostFeatures wait
+        for the same task. A probe that failed (e.g. cut off by its URL's deadline)
+        is run again for the next URL.
+        """
+        task = self.host_features.probes.get(name)
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+            task = self.host_features.probes[name] = asyncio.ensure_future(probe())
+        # Shielded so that one URL's deadline does not cancel the probe for the others
+        return await asyncio.shield(task)
+
+    def fetch_page(self):
+        # The page is fetched by fetch_page_async() on the event loop.
+        pass
+
+    async def fetch_page_async(self, session):
+        try:
+            stream = PageStream(self.parser)
+            response = await fetch_response(session, self.url, sink=stream, headers={"User-Agent": "Mozilla/5.0"})
+            # The rest of the parse runs off the loop too; set_response() finds the stream closed
+            await run_page_work(stream.close)
+            self.set_response(response, stream)
+        except Exception as e:
+            print(f"Error fetching URL: {e}")
+            self.set_page_error(e)
+
+    async def fetch_page_and_certificate(self, session):
+        await self.fetch_page_async(session)
+        await self.probe_certificate()
+
+    def certificate_age(self):
+        # The page fetch and the certificate probe have already run
+        return self.host_features.get('url_certificate_age', self.get_ssl_certificate_age)
+
+    async def probe_whois(self):
+        loop = asyncio.get_running_loop()
+        # python-whois has no async API, so the lookup runs on the default executor.
+        self._probes['whois'] = await self.host_probe('whois', lambda: loop.run_in_executor(
+            None, contextvars.copy_context().run, lookup_whois, self.domain))
+
+    async def probe_dns(self):
+        async def resolve():
+            try:
+                resolver = dns.asyncresolver.Resolver(configure=False)
+                resolver.timeout = 10
+                resolver.lifetime = 10
+                resolver.nameservers = ['8.8.8.8', '2001:4860:4860::8888',
+                                        '8.8.4.4', '2001:4860:4860::8844']
+
+                with instrumentation.network('dns'):
+                    answers = await resolver.resolve(self.domain)
+                return answers.rrset.ttl, len(answers)
+            except Exception:
+                return None
+
+        self._probes['dns'] = await self.host_probe('dns', lambda: cached_probe('dns', self.domain, resolve)) or (0, 0)
+
+    async def probe_certificate(self):
+        async def handshake():
+            try:
+                with instrumentation.network('certificate'):
+                    cert = await handshake_certificate(self.domain, http_client.get_settings()['connect_timeout'])
+                return certificate_start(cert)
+            except Exception:
+                return None
+
+        not_before = await self.host_probe('certificate', lambda: cached_probe('certificate', self.domain, handshake))
+        self._probes['certificate_age'] = (self.now - not_before).days if not_before else 0
+
+    async def probe_robots(self, session):
+        async def fetch():
+            try:
+                robots_url = f"{self.parsed_url.scheme}://{self.parsed_url.netloc}/robots.txt"
+                response = await fetch_response(session, robots_url, probe='robots', allow_redirects=True)
+                return 1 if response.status_code == 200 else 0
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print('has_robots error: ' + str(e))
+                return 0
+
+        self._probes['robots'] = await self.host_probe('robots', fetch)
+
+    async def probe_scripts(self, session):
+        if self._page_stats is None:
+            self._probes['scripts'] = {}
+            return
+        js_urls = []
+        for js_url, _ in self.page_stats.scripts:
+            if js_url:
+                if not js_url.startswith(('http://', 'https://')):
+                    js_url = urljoin(self.url, js_url)
+                js_urls.append(js_url)
+
+        async def download(js_url):
+            response = await fetch_response(session, js_url, probe='script')
+            response.raise_for_status()
+            return response.text
+
+        async def fetch(js_url):
+            try:
+                return js_url, await script_cache.get_script_async(js_url, download)
+            except Exception as e:
+                return js_url, e
+
+        # Stored only once every script is in, so a probe cut off by the deadline leaves no partial result
+        self._probes['scripts'] = dict(await asyncio.gather(*(fetch(js_url) for js_url in set(js_urls))))
+
+    async def extract_url_features_async(self, session, only=None):
+        """
+        Runs the network probes needed by the requested features (all features by
+        default) concurrently, then extracts them.
+        """
+        specs = feature_registry.FEATURES if only is None else feature_registry.select(only)
+        requires = {resource for spec in specs for resource in spec.requires}
+        probes = []
+        # The page's TLS connection may show the domain's certificate, so then the
+        # certificate probe waits for the page and only connects if it did not
+        certificate_after_page = ('fetch' in requires and 'certificate' in requires
+                                  and serves_domain_certificate(self.url, self.domain))
+        if certificate_after_page:
+            probes.append(self.fetch_page_and_certificate(session))
+        elif 'fetch' in requires:
+            probes.append(self.fetch_page_async(session))
+        if 'whois' in requires:
+            probes.append(self.probe_whois())
+        if 'dns' in requires:
+            probes.append(self.probe_dns())
+        if 'certificate' in requires and not certificate_after_page:
+            probes.append(self.probe_certificate())
+        if 'robots' in requires:
+            probes.append(self.probe_robots(session))
+        await gather_probes(probes)
+        if 'scripts' in requires and not deadline.expired():
+            await gather_probes([self.probe_scripts(session)])
+        # Every probe is done, so the features only read the extractor's results
+        return await run_page_work(self.extract_url_features, only)
+
+    def waits_on_network(self, spec):
+        # Every probe has finished or been abandoned before the features are computed,
+        # so a feature only misses its deadline if one of its probes did not finish.
+        for resource in spec.requires:
+            if resource in ('fetch', 'parse'):
+                if not self._page_fetched:
+                    return True
+            elif PROBE_KEYS[resource] not in self._probes:
+                return True
+        return False
+
+    def get_whois_info(self):
+        return self._probes.get('whois')
+
+    def get_dns_info(self):
+        return self._probes.get('dns', (0, 0))
+
+    def get_ssl_certificate_age(self):
+        return self._probes.get('certificate_age', 0)
+
+    def has_robots(self):
+        return self._probes.get('robots', 0)
+
+    def fetch_script(self, js_url):
+        result = self._probes.get('scripts', {}).get(js_url)
+        if result is None:
+            raise LookupError(f"script was not prefetched: {js_url}")
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+async def iter_many_async(urls, concurrency=1000, per_host_limit=2, features=None, deadline=None,
+                          defer_spelling=False):
+    """
+    Extracts features for a stream of URLs on one event loop: the async counterpart
+    of batch_extraction.extract_many().
+
+    Args:
+        urls (iterable): URLs to process. Consumed lazily, at most 2 * concurrency
+            URLs ahead of the result being yielded. A None item is yielded back as
+            (None, None) without any extraction.
+        concurrency (int): Maximum number of URLs being processed at once.
+        per_host_limit (int): Maximum number of open connections to one host.
+        features (iterable): Names of the features to extract (all by default); only
+            the probes they need are run.
+        deadline (float): Per-URL deadline in seconds (see batch_extraction.extract_one).
+        defer_spelling (bool): Leave spelling_mistakes_ratio for
+            feature_extraction.score_spelling() (see batch_extraction.extract_one).
+
+    Yields:
+        tuple: (url, features) for every input URL, in input order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host_limit)
+    settings = http_client.get_settings()
+    timeout = aiohttp.ClientTimeout(total=settings['total_timeout'], sock_connect=settings['connect_timeout'],
+                                    sock_read=settings['read_timeout'])
+
+    host_groups = HostGroups()
+    max_pending = concurrency * 2
+
+    # trust_env so that HTTP(S)_PROXY and NO_PROXY apply as they do to requests
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, trust_env=True) as session:
+        async def extract(url):
+            if url is None:
+                return None, None
+            async with semaphore:
+                try:
+                    extractor = AsyncURLFeatureExtractor(url, host_features=host_groups.host_features(url),
+                                                         defer_spelling=defer_spelling)
+                except Exception as e:
+                    print(f"[ERROR] Feature extraction failed for {url}: {e}")
+                    return url, {}
+                with instrumentation.trace_url(url), budget(deadline):
+                    try:
+                        return url, await extractor.extract_url_features_async(session, features)
+                    except Exception as e:
+                        print(f"[ERROR] Feature extraction failed for {url}: {e}")
+                        return url, extractor.features
+                    finally:
+                        extractor.release_page()
+
+        pending = deque()
+        for url in urls:
+            pending.append(asyncio.ensure_future(extract(url)))
+            while pending and (len(pending) >= max_pending or pending[0].done()):
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+
+
+async def extract_many_async(urls, concurrency=1000, per_host_limit=2, features=None, deadline=None):
+    """
+    Extracts features for many URLs on one event loop.
+
+    Args:
+        urls (iterable): URLs to process.
+        concurrency (int): Maximum number of URLs being processed at once.
+        per_host_limit (int): Maximum number of open connections to one host.
+        features (iterable): Names of the features to extract (all by default); only
+            the probes they need are run.
+        deadline (float): Per-URL deadline in seconds (see batch_extraction.extract_one).
+
+    Returns:
+        list: (url, features) tuples in input order.
+    """
+    return [result async for result in iter_many_async(urls, concurrency, per_host_limit, features, deadline)]
@@ -0,0 +1,195 @@
+# batch_extraction.py
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+import tldextract
+
+import instrumentation
+from deadline import budget
+from feature_extraction import URLFeatureExtractor, HostFeatures
+from model import classify_lazily
+
+# Host groups an extraction keeps (see HostGroups).
+MAX_HOST_GROUPS = 100000
+
+
+def host_key(url):
+    """
+    Groups URLs that share host-scoped features: registered domain plus scheme and
+    netloc (robots.txt is fetched per scheme and netloc).
+    """
+    parsed = urlparse(url)
+    domain_info = tldextract.extract(url)
+    domain = f"{domain_info.domain}.{domain_info.suffix}" if domain_info.suffix else domain_info.domain
+    return domain, parsed.scheme.lower(), parsed.netloc.lower()
+
+
+class HostGroups:
+    """
+    Hands out one HostFeatures per host group, so URLs on the same host share
+    their WHOIS, DNS, certificate and robots.txt features.
+
+    Args:
+        max_groups (int): Host groups kept; the least recently used is dropped
+            beyond that, so one extraction over a long stream stays bounded.
+    """
+
+    def __init__(self, max_groups=MAX_HOST_GROUPS):
+        self.max_groups = max_groups
+        self._groups = OrderedDict()
+        self._lock = threading.Lock()
+
+    def host_features(self, url):
+        key = host_key(url)
+        with self._lock:
+            if key in self._groups:
+                self._groups.move_to_end(key)
+            else:
+                self._groups[key] = HostFeatures()
+                if len(self._groups) > self.max_groups:
+                    self._groups.popitem(last=False)
+            return self._groups[key]
+
+    def __len__(self):
+        return len(self._groups)
+
+
+class HostLimiter:
+    """
+    Caps how many URLs on the same host are being extracted at once. A host's
+    semaphore is dropped as soon as no URL on it is waiting or running, so a
+    long-lived limiter only holds the hosts in use.
+    """
+
+    def __init__(self, per_host_limit):
+        self.per_host_limit = per_host_limit
+        self._lock = threading.Lock()
+        self._hosts = {}  # host -> [BoundedSemaphore, number of URLs waiting or running]
+
+    @contextmanager
+    def hold(self, url):
+        """
+        Holds one of the URL's host slots for the duration of the block.
+        """
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is None:
+                entry = self._hosts[host] = [threading.BoundedSemaphore(self.per_host_limit), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._hosts[host]
+
+    def __len__(self):
+        return len(self._hosts)
+
+
+def extract_one(url, limiter=None, host_groups=None, features=None, tree_model=None, deadline=None,
+                defer_spelling=False):
+    """
+    Extracts features for a single URL, reusing host-scoped features from host_groups.
+
+    Errors are reported and whatever features were collected before the failure are
+    returned, so one bad URL does not abort a whole batch.
+
+    Args:
+        features (iterable): Names of the features to extract (all by default).
+        tree_model (DecisionTreeClassifier): Extract only the features the tree tests
+            on this URL's decision path (see model.classify_lazily).
+        deadline (float): Seconds the extraction may take once the URL's turn on its
+            host has come; features that would run past it fall back to their default
+            and are listed under feature_registry.MISSING_FEATURES.
+        defer_spelling (bool): Leave spelling_mistakes_ratio to be scored with a batch
+            of URLs by feature_extraction.score_spelling() (ignored with tree_model).
+    """
+    with limiter.hold(url) if limiter else nullcontext():
+        try:
+            with instrumentation.trace_url(url), budget(deadline):
+                host_features = host_groups.host_features(url) if host_groups is not None else None
+                extractor = URLFeatureExtractor(url, host_features=host_features,
+                                                defer_spelling=defer_spelling and tree_model is None)
+                try:
+                    if tree_model is not None:
+                        classify_lazily(extractor, tree_model)
+                        return extractor.features
+                    return extractor.extract_url_features(features)
+                except Exception as e:
+                    print(f"[ERROR] Feature extraction failed for {url}: {e}")
+                    return extractor.features
+                finally:
+                    extractor.release_page()
+        except Exception as e:
+            print(f"[ERROR] Feature extraction failed for {url}: {e}")
+            return {}
+
+
+def extract_many(urls, workers=8, per_host_limit=2, ordered=True, features=None, tree_model=None, deadline=None,
+                 defer_spelling=False):
+    """
+    Extracts features for many URLs on a bounded pool of worker threads.
+
+    URLs are grouped by host (see host_key): host-scoped features are computed once
+    per group and shared, only page-scoped features are computed per URL.
+
+    Args:
+        urls (iterable): URLs to process. Consumed lazily, so generators are fine. A
+            None item is yielded back as (None, None) without any extraction, so a
+            caller can keep rows it does not need extracted in step with the results.
+        workers (int): Number of worker threads.
+        per_host_limit (int): Maximum number of concurrent extractions against one host.
+        ordered (bool): Yield results in input order (True) or as they complete (False).
+        features (iterable): Names of the features to extract (all by default).
+        tree_model (DecisionTreeClassifier): Extract only the features on each URL's
+            decision path through this tree.
+        deadline (float): Per-URL deadline in seconds (see extract_one).
+        defer_spelling (bool): Leave spelling_mistakes_ratio for score_spelling() (see extract_one).
+
+    Yields:
+        tuple: (url, features) for every input URL.
+    """
+    limiter = HostLimiter(per_host_limit)
+    host_groups = HostGroups()
+    # Keep a bounded window of submitted work so huge feeds do not queue up in memory.
+    max_pending = workers * 2
+    url_iter = iter(urls)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        def submit_next():
+            for url in url_iter:
+                if url is None:
+                    future = Future()
+                    future.set_result(None)
+                else:
+                    future = executor.submit(extract_one, url, limiter, host_groups, features, tree_model, deadline,
+                                             defer_spelling)
+                pending.append((url, future))
+                return True
+            return False
+
+        while len(pending) < max_pending and submit_next():
+            pass
+
+        while pending:
+            if ordered:
+                url, future = pending.popleft()
+                url_features = future.result()
+            else:
+                done, _ = wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+                for index, (url, future) in enumerate(pending):
+                    if future in done:
+                        del pending[index]
+                        break
+                url_features = future.result()
+            submit_next()
+            yield url, url_features
@@ -0,0 +1,596 @@
+# benchmark.py
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import dns.asyncresolver
+import dns.resolver
+import whois
+
+import async_feature_extraction
+import domain_cache
+import feature_extraction
+import feature_registry
+import http_client
+import instrumentation
+import script_cache
+from async_feature_extraction import extract_many_async
+from batch_extraction import extract_many
+from model import load_model, classify_features, preprocess_and_classify
+from pipeline import FEATURE_COLUMNS
+
+# Every benchmark run is reproducible: the corpus, the latencies and the WHOIS, DNS
+# and certificate answers are all derived from the seed.
+DEFAULT_SEED = 1
+# Seconds between samples of the resident set size while a phase runs.
+RSS_SAMPLE_INTERVAL = 0.01
+# Caveats printed with every report.
+NOTES = ("The stand-in web serves HTTP only, so reusing the page's TLS certificate for "
+         "url_certificate_age (instead of a handshake of its own) is not measured.",)
+
+WORDS = ("account", "service", "customer", "product", "report", "article", "market", "company", "research",
+         "support", "community", "network", "history", "project", "weather", "travel", "health", "science",
+         "library", "student", "program", "question", "answer", "review", "people", "update", "contact",
+         "online", "secure", "information", "payment", "delivery", "shipping", "schedule", "garden")
+MISSPELLED = ("acount", "verifcation", "pasword", "securty", "sucessful", "imediately", "suspnded", "confrim",
+              "paymnet", "custmer", "authenticaton", "unusuall")
+PHISHING_PATHS = ("/login/verify.php", "/secure/update-account", "/signin/confirm", "/wp-includes/paypal/",
+                  "/account/suspended/restore.html")
+
+
+class Corpus:
+    """
+    Deterministic synthetic web of benign and phishing-like sites.
+
+    Every site gets its own registered domain, so WHOIS, DNS and certificate probes
+    are exercised once per site and page-scoped features once per URL.
+
+    Args:
+        urls (int): Number of page URLs.
+        sites (int): Number of distinct sites (registered domains).
+        page_kb (float): Approximate size of every page in kilobytes.
+        scripts (int): External scripts per page (half of them on a shared CDN host).
+        forms (int): Forms per page (phishing pages ask for a password).
+        phishing_ratio (float): Fraction of sites that are phishing-like.
+        seed (int): Random seed.
+    """
+
+    def __init__(self, urls=200, sites=20, page_kb=20, scripts=4, forms=1, phishing_ratio=0.3, seed=DEFAULT_SEED):
+        self.rng = random.Random(seed)
+        self.page_kb = page_kb
+        self.scripts = scripts
+        self.forms = forms
+        self.documents = {}  # (host, path) -> (content type, body bytes)
+        self.sites = {}  # registered domain -> "phishing" or "benign"
+        self.urls = []
+
+        hosts = []
+        for site in range(max(1, sites)):
+            phishing = self.rng.random() < phishing_ratio
+            domain = f"secure-login-bench{site}.com" if phishing else f"bench-site{site}.com"
+            self.sites[domain] = "phishing" if phishing else "benign"
+            hosts.append(domain)
+            self.documents[(domain, '/robots.txt')] = ('text/plain', b"User-agent: *\nDisallow: /private/\n")
+        for index in range(urls):
+            host = hosts[index % len(hosts)]
+            if self.sites[host] == "phishing":
+                path = f"{self.rng.choice(PHISHING_PATHS)}?id={self.rng.randrange(10 ** 6)}&session=" \
+                       f"{self.rng.getrandbits(64):x}"
+                html = self.phishing_page()
+            else:
+                path = f"/articles/{self.rng.choice(WORDS)}-{index}.html"
+                html = self.benign_page()
+            self.documents[(host, path)] = ('text/html; charset=utf-8', html.encode())
+            self.urls.append(f"http://{host}{path}")
+        for host in hosts + ['cdn-bench.net']:
+            for number in range(scripts):
+                self.documents[(host, f'/js/{number}.js')] = ('application/javascript', self.script(number))
+
+    def text(self, words, misspell=0.0):
+        return " ".join(self.rng.choice(MISSPELLED) if self.rng.random() < misspell else self.rng.choice(WORDS)
+                        for _ in range(words))
+
+    def script(self, number):
+        body = "".join(f"function f{number}_{i}(a){{return a*{i}+{number};}}\n" for i in range(40))
+        return (body + f"var data{number}='{self.text(30)}';\n").encode()
+
+    def script_tags(self):
+        tags = []
+        for number in range(self.scripts):
+            source = f"/js/{number}.js" if number % 2 == 0 else f"http://cdn-bench.net/js/{number}.js"
+            tags.append(f'<script src="{source}"></script>')
+        return "\n".join(tags)
+
+    def pad(self, parts, misspell):
+        # Append paragraphs until the page reaches its configured size
+        target = int(self.page_kb * 1024)
+        size = sum(len(part) for part in parts)
+        while size < target:
+            paragraph = f"<p>{self.text(60, misspell)}</p>"
+            parts.append(paragraph)
+            size += len(paragraph)
+
+    def benign_page(self):
+        parts = [f"<!DOCTYPE html><html><head><title>{self.text(4)}</title>", self.script_tags(),
+                 "</head><body>", '<nav><a href="/">Home</a> <a href="/about.html">About</a> '
+                 '<a href="/contact.html">Contact</a> <a href="https://www.example.org/">Partner</a></nav>',
+                 f"<h1>{self.text(6)}</h1>"]
+        for _ in range(self.forms):
+            parts.append('<form action="/search" method="get"><input type="text" name="q">'
+                         '<input type="submit" value="Search"></form>')
+        self.pad(parts, misspell=0.0)
+        parts.append("<footer>Copyright</footer></body></html>")
+        return "\n".join(parts)
+
+    def phishing_page(self):
+        parts = [f"<!DOCTYPE html><html><head><title>Verify your {self.rng.choice(WORDS)} account</title>",
+                 self.script_tags(),
+                 "<script>document.onmousedown = function(event){if (event.button==2) {return false;}};</script>",
+                 "</head><body>", f"<h1>{self.text(6, misspell=0.3)}</h1>",
+                 '<iframe src="http://cdn-bench.net/frame.html" width="0" height="0"></iframe>',
+                 '<a href="http://collect-bench.biz/">Help</a> <a href="#">Terms</a> <a href="#">Privacy</a>']
+        for number in range(self.forms):
+            action = "http://collect-bench.biz/post.php" if number % 2 == 0 else "mailto:drop@collect-bench.biz"
+            parts.append(f'<form action="{action}" method="post"><input type="email" name="email">'
+                         '<input type="password" name="password"><input type="hidden" name="token" value="x">'
+                         '<input type="submit" value="Sign in"></form>')
+        self.pad(parts, misspell=0.2)
+        parts.append("</body></html>")
+        return "\n".join(parts)
+
+    def domain_of(self, host):
+        parts = host.rsplit('.', 2)
+        return ".".join(parts[-2:])
+
+    def whois_record(self, domain):
+        phishing = self.sites.get(domain) == "phishing"
+        rng = random.Random(f"whois:{domain}")
+        # Dates are relative to today, so the age features are the same on every run
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        created = today - timedelta(days=rng.randrange(3, 60) if phishing else rng.randrange(900, 8000))
+        return domain_cache.WhoisRecord(
+            domain_name=domain.upper(), domain=domain,
+            registrar="Bench Registrar" if phishing else "Bench Registrar Inc.",
+            country=None if phishing else "US",
+            emails=None if phishing else [f"hostmaster@{domain}"],
+            creation_date=created,
+            expiration_date=today + timedelta(days=rng.randrange(300, 365) if phishing else rng.randrange(400, 3000)))
+
+    def dns_answer(self, domain):
+        phishing = self.sites.get(domain) == "phishing"
+        rng = random.Random(f"dns:{domain}")
+        return (rng.choice((60, 300)) if phishing else rng.choice((3600, 86400))), rng.randrange(1, 4)
+
+    def certificate(self, domain):
+        phishing = self.sites.get(domain) == "phishing"
+        rng = random.Random(f"certificate:{domain}")
+        issued = datetime.now() - timedelta(days=rng.randrange(1, 30) if phishing else rng.randrange(60, 300))
+        return {'notBefore': issued.strftime('%b %d %H:%M:%S %Y GMT'),
+                'issuer': ((('organizationName', 'Bench CA'),),)}
+
+
+class _DNSAnswer:
+    # The parts of a dns.resolver.Answer that resolve_dns() reads
+
+    def __init__(self, ttl, addresses):
+        self.rrset = SimpleNamespace(ttl=ttl)
+        self._addresses = addresses
+
+    def __len__(self):
+        return self._addresses
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    # Requests arrive in proxy form ("GET http://host/path"), so one local server
+    # answers for every hostname in the corpus.
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parsed = urlsplit(self.path)
+        host = (parsed.hostname or self.headers.get('Host', '')).split(':')[0]
+        path = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+        self.server.stand_in.sleep(f"http:{host}{path}")
+        document = self.server.corpus.documents.get((host, path))
+        if document is None:
+            content_type, body, status = 'text/html', b"<html><body>Not found</body></html>", 404
+        else:
+            (content_type, body), status = document, 200
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up, e.g. when its deadline passed
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInWeb:
+    """
+    Local stand-in for the internet: an HTTP server (used as the HTTP proxy) that
+    serves the corpus, plus WHOIS, DNS and TLS certificate answers, each with
+    injected latency.
+
+    Args:
+        corpus (Corpus): Sites and pages to serve.
+        latency (float): Milliseconds added to every HTTP response.
+        jitter (float): Up to this many extra milliseconds per response.
+        probe_latency (float): Milliseconds added to every WHOIS, DNS and certificate answer.
+        seed (int): Seed of the per-request jitter.
+    """
+
+    def __init__(self, corpus, latency=0.0, jitter=0.0, probe_latency=0.0, seed=DEFAULT_SEED):
+        self.corpus = corpus
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.probe_latency = probe_latency / 1000
+        self.seed = seed
+        self.server = None
+        self._saved = []
+
+    def delay(self, key, base=None):
+        # The jitter of a request depends only on what is requested, not on timing
+        seconds = self.latency if base is None else base
+        if self.jitter:
+            seconds += self.jitter * (zlib.crc32(f"{self.seed}:{key}".encode()) % 1000) / 1000
+        return seconds
+
+    def sleep(self, key, base=None, timeout=None):
+        seconds = self.delay(key, base)
+        # A probe slower than its timeout fails after the timeout, like a socket would
+        if timeout is not None and seconds > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"stand-in {key} timed out after {timeout}s")
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def sleep_async(self, key, base=None, timeout=None):
+        # sleep() for the probes of the async extractor
+        seconds = self.delay(key, base)
+        if timeout is not None and seconds > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"stand-in {key} timed out after {timeout}s")
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def _patch(self, target, name, value):
+        self._saved.append((target, name, getattr(target, name)))
+        setattr(target, name, value)
+
+    def __enter__(self):
+        corpus = self.corpus
+        web = self
+
+        def fake_whois(domain, *args, timeout=10, **kwargs):
+            web.sleep(f"whois:{domain}", web.probe_latency, timeout)
+            return corpus.whois_record(corpus.domain_of(domain))
+
+        def fake_resolve(resolver, qname, *args, **kwargs):
+            web.sleep(f"dns:{qname}", web.probe_latency, resolver.lifetime)
+            return _DNSAnswer(*corpus.dns_answer(corpus.domain_of(str(qname))))
+
+        def fake_certificate(domain, timeout=5):
+            web.sleep(f"certificate:{domain}", web.probe_latency, timeout)
+            return corpus.certificate(corpus.domain_of(domain))
+
+        async def fake_resolve_async(resolver, qname, *args, **kwargs):
+            await web.sleep_async(f"dns:{qname}", web.probe_latency, resolver.lifetime)
+            return _DNSAnswer(*corpus.dns_answer(corpus.domain_of(str(qname))))
+
+        async def fake_certificate_async(domain, timeout=5):
+            await web.sleep_async(f"certificate:{domain}", web.probe_latency, timeout)
+            return corpus.certificate(corpus.domain_of(domain))
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+        self.server.daemon_threads = True
+        self.server.corpus = corpus
+        self.server.stand_in = self
+        threading.Thread(target=self.server.serve_forever, name='stand-in-web', daemon=True).start()
+
+        proxy = f"http://127.0.0.1:{self.server.server_address[1]}"
+        for name, value in (('HTTP_PROXY', proxy), ('http_proxy', proxy), ('NO_PROXY', ''), ('no_proxy', '')):
+            self._saved.append((os.environ, name, os.environ.get(name)))
+            os.environ[name] = value
+        self._patch(whois, 'whois', fake_whois)
+        self._patch(dns.resolver.Resolver, 'resolve', fake_resolve)
+        self._patch(feature_extraction, 'peer_certificate', fake_certificate)
+        self._patch(dns.asyncresolver.Resolver, 'resolve', fake_resolve_async)
+        self._patch(async_feature_extraction, 'handshake_certificate', fake_certificate_async)
+        return self
+
+    def __exit__(self, *exc_info):
+        for target, name, value in reversed(self._saved):
+            if target is os.environ:
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            else:
+                setattr(target, name, value)
+        self._saved = []
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far, in megabytes.
+    """
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def current_rss_mb():
+    """
+    Current resident set size of this process in megabytes, or None where
+    /proc/self/statm is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * resource.getpagesize() / 2 ** 20
+
+
+def reset_state():
+    """
+    Starts a measurement from cold domain and script caches, a new HTTP session and
+    fresh instrumentation, so every phase is measured the same way.
+    """
+    domain_cache.configure(path=None)
+    script_cache.clear()
+    http_client.configure()
+    instrumentation.configure()
+
+
+@contextlib.contextmanager
+def measure(name, report, trace_memory=False):
+    """
+    Records the wall time, memory and (with trace_memory) the peak of Python
+    allocations of the block in report[name].
+
+    The process peak RSS only ever grows, so a phase after a bigger one could not
+    show its own use. rss_delta_mb is how far the resident set rose above its size
+    at the start of the block, sampled every RSS_SAMPLE_INTERVAL seconds (or, without
+    /proc, how far the block raised the process peak).
+    """
+    if trace_memory:
+        tracemalloc.reset_peak()
+    result = report.setdefault(name, {})
+    start_rss = current_rss_mb()
+    start_peak = peak_rss_mb()
+    sampled_peak = start_rss
+    stop = threading.Event()
+
+    def sample():
+        nonlocal sampled_peak
+        while not stop.wait(RSS_SAMPLE_INTERVAL):
+            sampled_peak = max(sampled_peak, current_rss_mb())
+
+    sampler = threading.Thread(target=sample, daemon=True) if start_rss is not None else None
+    if sampler is not None:
+        sampler.start()
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = round(time.perf_counter() - start, 4)
+        result['peak_rss_mb'] = peak_rss_mb()
+        if sampler is not None:
+            stop.set()
+            sampler.join()
+            sampled_peak = max(sampled_peak, current_rss_mb())
+            result['rss_delta_mb'] = round(sampled_peak - start_rss, 1)
+        else:
+            result['rss_delta_mb'] = round(result['peak_rss_mb'] - start_peak, 1)
+        if trace_memory:
+            result['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+
+
+def stage_latencies(stats):
+    """
+    Picks the per-URL, per-stage and per-probe p50/p95/p99 latencies out of an
+    instrumentation summary.
+    """
+    return {name: {key: metric[key] for key in ('count', 'p50', 'p95', 'p99', 'total')}
+            for name, metric in stats['metrics'].items()
+            if name == 'url.total' or name.startswith(('stage.', 'network.'))}
+
+
+def bench_extractor(corpus, report, workers, trace_memory, deadline=None):
+    reset_state()
+    with measure('extractor', report, trace_memory) as result:
+        rows = [dict(features, url=url)
+                for url, features in extract_many(corpus.urls, workers=workers, deadline=deadline)]
+    result['urls'] = len(rows)
+    result['partial'] = sum(1 for row in rows if feature_registry.MISSING_FEATURES in row)
+    result['urls_per_sec'] = round(len(rows) / result['seconds'], 2) if result['seconds'] else None
+    result['stages'] = stage_latencies(instrumentation.summary())
+    result['bytes'] = instrumentation.summary()['bytes']
+    return rows
+
+
+def bench_async(corpus, report, workers, trace_memory, deadline=None):
+    reset_state()
+    with measure('async', report, trace_memory) as result:
+        rows = [dict(features, url=url) for url, features in
+                asyncio.run(extract_many_async(corpus.urls, concurrency=workers, deadline=deadline))]
+    result['urls'] = len(rows)
+    result['partial'] = sum(1 for row in rows if feature_registry.MISSING_FEATURES in row)
+    result['urls_per_sec'] = round(len(rows) / result['seconds'], 2) if result['seconds'] else None
+    result['stages'] = stage_latencies(instrumentation.summary())
+    result['bytes'] = instrumentation.summary()['bytes']
+
+
+def bench_classifier(rows, report, classify_rows, directory, trace_memory):
+    # Replicate the extracted rows so classification is measured on a realistic volume
+    rows = [rows[index % len(rows)] for index in range(classify_rows)]
+    features_csv = os.path.join(directory, 'benchmark_features.csv')
+    with open(features_csv, 'w', newline='') as file:
+        writer = csv.DictWriter(file, FEATURE_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    model = load_model()
+
+    with measure('preprocess_and_classify', report, trace_memory) as result, \
+            contextlib.redirect_stdout(io.StringIO()):
+        results = preprocess_and_classify(features_csv)
+    result['rows'] = len(results)
+    result['rows_per_sec'] = round(len(results) / result['seconds'], 1) if result['seconds'] else None
+
+    with measure('classify_features', report, trace_memory) as result:
+        labels = classify_features(rows, model)
+    result['rows'] = len(labels)
+    result['rows_per_sec'] = round(len(labels) / result['seconds'], 1) if result['seconds'] else None
+
+
+def bench_main(corpus, report, workers, directory, trace_memory, deadline=None):
+    import main as main_module
+
+    urls_csv = os.path.join(directory, 'benchmark_urls.csv')
+    with open(urls_csv, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['url'])
+        writer.writerows([url] for url in corpus.urls)
+    reset_state()
+    cwd = os.getcwd()
+    os.chdir(directory)  # main() writes its CSVs to the working directory
+    try:
+        with measure('main', report, trace_memory) as result, contextlib.redirect_stdout(io.StringIO()):
+            main_module.main(urls_csv, workers=workers, deadline=deadline)
+    finally:
+        os.chdir(cwd)
+    with open(os.path.join(directory, 'classified_results.csv'), newline='') as file:
+        result['urls'] = sum(1 for _ in file) - 1
+    result['urls_per_sec'] = round(result['urls'] / result['seconds'], 2) if result['seconds'] else None
+    result['stages'] = stage_latencies(instrumentation.summary())
+
+
+def run_benchmark(urls=200, sites=20, page_kb=20, scripts=4, forms=1, phishing_ratio=0.3, latency=0.0,
+                  jitter=0.0, probe_latency=0.0, workers=8, classify_rows=10000, seed=DEFAULT_SEED,
+                  phases=('extractor', 'async', 'classifier', 'main'), trace_memory=False, deadline=None):
+    """
+    Runs the benchmark phases against a local stand-in web.
+
+    Phases:
+        extractor: URLFeatureExtractor over the corpus (through extract_many).
+        async: AsyncURLFeatureExtractor over the corpus (through extract_many_async,
+            with workers as the concurrency).
+        classifier: preprocess_and_classify() on classify_rows extracted rows, and
+            classify_features() on the same rows for comparison.
+        main: the full main() path (streaming extraction, classification and CSVs).
+
+    With a deadline (seconds per URL), the extractor, async and main phases run under
+    it and the extractor and async phases count the URLs classified from a partial
+    feature vector. The report's notes list what the stand-in web cannot measure.
+
+    Returns:
+        dict: The settings and, per phase, seconds, URLs (or rows) per second,
+            per-stage p50/p95/p99 latencies and memory (see measure()).
+    """
+    corpus = Corpus(urls, sites, page_kb, scripts, forms, phishing_ratio, seed)
+    report = {'settings': {'urls': urls, 'sites': sites, 'page_kb': page_kb, 'scripts': scripts, 'forms': forms,
+                           'phishing_ratio': phishing_ratio, 'latency_ms': latency, 'jitter_ms': jitter,
+                           'probe_latency_ms': probe_latency, 'workers': workers, 'classify_rows': classify_rows,
+                           'seed': seed, 'deadline': deadline},
+              'phases': {}, 'notes': list(NOTES)}
+    # Load the model and the spell checker up front so no phase pays for them
+    load_model()
+    feature_extraction.get_spell_checker()
+    report['baseline_rss_mb'] = peak_rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with StandInWeb(corpus, latency, jitter, probe_latency, seed), \
+                tempfile.TemporaryDirectory(prefix='benchmark-') as directory:
+            rows = None
+            if 'extractor' in phases or 'classifier' in phases:
+                rows = bench_extractor(corpus, report['phases'], workers, trace_memory, deadline)
+            if 'async' in phases:
+                bench_async(corpus, report['phases'], workers, trace_memory, deadline)
+            if 'classifier' in phases:
+                bench_classifier(rows, report['phases'], classify_rows, directory, trace_memory)
+            if 'main' in phases:
+                bench_main(corpus, report['phases'], workers, directory, trace_memory, deadline)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        instrumentation.configure()
+    return report
+
+
+def print_report(report):
+    print(f"[INFO] Benchmark settings: {report['settings']}")
+    for name, result in report['phases'].items():
+        rate = (f"{result['urls_per_sec']} URLs/sec" if 'urls_per_sec' in result
+                else f"{result['rows_per_sec']} rows/sec")
+        if result.get('partial'):
+            rate += f" ({result['partial']} URLs with a partial feature vector)"
+        memory = f"RSS +{result['rss_delta_mb']} MB (process peak {result['peak_rss_mb']} MB)"
+        if 'peak_traced_mb' in result:
+            memory += f", peak traced {result['peak_traced_mb']} MB"
+        print(f"[INFO] {name}: {result['seconds']:.3f}s, {rate}, {memory}")
+        for stage, stats in result.get('stages', {}).items():
+            print(f"[INFO]   {stage}: p50 {stats['p50']:.4f}s, p95 {stats['p95']:.4f}s, p99 {stats['p99']:.4f}s "
+                  f"({stats['count']} calls)")
+    for note in report.get('notes', ()):
+        print(f"[INFO] Note: {note}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark feature extraction and classification offline, against a local stand-in web "
+                    "with stand-in WHOIS, DNS and TLS answers.")
+    parser.add_argument("--urls", type=int, default=200, help="number of page URLs in the corpus")
+    parser.add_argument("--sites", type=int, default=20, help="number of distinct sites (registered domains)")
+    parser.add_argument("--page-kb", type=float, default=20, help="approximate page size in kilobytes")
+    parser.add_argument("--scripts", type=int, default=4, help="external scripts per page")
+    parser.add_argument("--forms", type=int, default=1, help="forms per page")
+    parser.add_argument("--phishing-ratio", type=float, default=0.3, help="fraction of phishing-like sites")
+    parser.add_argument("--latency", type=float, default=0.0, help="milliseconds added to every HTTP response")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="up to this many extra milliseconds per HTTP response (deterministic per URL)")
+    parser.add_argument("--probe-latency", type=float, default=0.0,
+                        help="milliseconds added to every WHOIS, DNS and certificate answer")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="extraction worker threads (concurrent URLs in the async phase)")
+    parser.add_argument("--deadline", type=float, help="per-URL extraction deadline in seconds")
+    parser.add_argument("--classify-rows", type=int, default=10000,
+                        help="rows classified by the preprocess_and_classify phase")
+    parser.add_argument("--phases", default="extractor,async,classifier,main",
+                        help="comma-separated phases to run (extractor, async, classifier, main)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="random seed of the corpus and latencies")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also report the peak of Python allocations per phase (slower)")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args.urls, args.sites, args.page_kb, args.scripts, args.forms, args.phishing_ratio,
+                           args.latency, args.jitter, args.probe_latency, args.workers, args.classify_rows,
+                           args.seed, tuple(args.phases.split(',')), args.trace_memory, args.deadline)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"[INFO] Benchmark report saved to '{args.output}'")
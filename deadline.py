@@ -0,0 +1,110 @@
+# deadline.py
+import contextvars
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised by a probe that was cut short because the URL's deadline passed.
+    """
+
+
+class Deadline:
+    """
+    Time budget for extracting one URL, shared by every probe made on its behalf.
+
+    Args:
+        seconds (float): Budget in seconds, starting now.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires
+
+    def expire(self):
+        """
+        Ends the budget now, e.g. once probes have been abandoned at a timer that
+        may fire a little before the deadline itself.
+        """
+        self.expires = min(self.expires, time.monotonic())
+
+
+_current = contextvars.ContextVar('deadline', default=None)
+
+
+@contextmanager
+def budget(seconds):
+    """
+    Applies a deadline of the given seconds to everything inside the block (in this
+    thread, or in tasks and copied contexts started from it). None means no deadline.
+    """
+    if seconds is None:
+        yield None
+        return
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current():
+    """
+    Returns the Deadline in effect, or None.
+    """
+    return _current.get()
+
+
+def remaining():
+    """
+    Returns the seconds left on the current deadline, or None without a deadline.
+    """
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def expired():
+    deadline = _current.get()
+    return deadline is not None and deadline.expired()
+
+
+def check():
+    """
+    Raises DeadlineExceeded if the current deadline has passed.
+    """
+    deadline = _current.get()
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded(f"the {deadline.seconds}s deadline has passed")
+
+
+def timeout(seconds):
+    """
+    Returns a probe timeout (seconds, or None for no timeout) clipped to the time
+    left on the current deadline. Raises DeadlineExceeded if no time is left.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return seconds
+    check()
+    left = deadline.remaining()
+    return left if seconds is None else min(seconds, left)
+
+
+def result(future):
+    """
+    Returns future.result(), waiting no longer than the current deadline allows.
+    """
+    try:
+        return future.result(timeout=remaining())
+    except FutureTimeoutError:
+        check()
+        raise
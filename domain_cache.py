@@ -0,0 +1,235 @@
+# domain_cache.py
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+import deadline
+
+# Default time-to-live (seconds) for each kind of domain-level signal.
+DEFAULT_TTLS = {
+    'whois': 7 * 24 * 3600,
+    'dns': 24 * 3600,
+    'certificate': 3 * 24 * 3600,
+}
+
+# Failed lookups are remembered in memory only, and only briefly, so transient
+# errors (rate limits, timeouts) are retried on a later run.
+NEGATIVE_TTL = 10 * 60
+
+# Signals kept in memory; the least recently used are dropped beyond that (they
+# stay in the SQLite file, if any).
+MAX_MEMORY_ENTRIES = 100000
+
+
+class WhoisRecord(dict):
+    """
+    WHOIS record restored from the cache. Supports the same attribute access as
+    the whois.WhoisEntry it was stored from.
+    """
+
+    def __getattr__(self, name):
+        return self.get(name)
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    return str(value)
+
+
+def _decode(obj):
+    if '$datetime' in obj:
+        return datetime.fromisoformat(obj['$datetime'])
+    return obj
+
+
+def _restore(kind, value):
+    if kind == 'whois':
+        return WhoisRecord(value)
+    if kind == 'dns':
+        return tuple(value)
+    return value
+
+
+class DomainCache:
+    """
+    Two-level cache for domain-level signals (WHOIS, DNS, TLS certificate) keyed by
+    registered domain: an in-process dictionary in front of an optional SQLite file
+    that persists successful lookups across runs.
+
+    Args:
+        path (str): SQLite file to persist lookups in, or None for memory only.
+        ttls (dict): Per-kind TTL overrides in seconds, merged over DEFAULT_TTLS.
+        offline (bool): Never run lookups; cache misses return None.
+        max_entries (int): Signals kept in memory (least recently used dropped first).
+    """
+
+    def __init__(self, path=None, ttls=None, offline=False, max_entries=MAX_MEMORY_ENTRIES):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.offline = offline
+        self.max_entries = max_entries
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self._memory = OrderedDict()  # (kind, domain) -> (value, expiry), least recently used first
+        self._lock = threading.Lock()
+        self._key_locks = {}  # (kind, domain) -> [Lock, number of lookups waiting or running]
+        self._db = None
+        if path:
+            # The timeout lets shard processes sharing one cache file wait for each other's writes
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS domain_signals ("
+                "kind TEXT NOT NULL, domain TEXT NOT NULL, value TEXT NOT NULL, fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (kind, domain))"
+            )
+            self._db.commit()
+
+    def get(self, kind, domain):
+        """
+        Returns (hit, value) for a cached signal, counting the hit or miss.
+        """
+        with self._lock:
+            hit, value = self._find(kind, domain)
+            if hit:
+                self.hits[kind] += 1
+            else:
+                self.misses[kind] += 1
+            return hit, value
+
+    def peek(self, kind, domain):
+        """
+        Returns (hit, value) like get(), without counting it in stats().
+        """
+        with self._lock:
+            return self._find(kind, domain)
+
+    def _find(self, kind, domain):
+        now = time.time()
+        entry = self._memory.get((kind, domain))
+        if entry and entry[1] > now:
+            self._memory.move_to_end((kind, domain))
+            return True, entry[0]
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT value, fetched_at FROM domain_signals WHERE kind = ? AND domain = ?",
+                (kind, domain)).fetchone()
+            if row and row[1] + self.ttls[kind] > now:
+                value = _restore(kind, json.loads(row[0], object_hook=_decode))
+                self._remember(kind, domain, value, row[1] + self.ttls[kind])
+                return True, value
+        return False, None
+
+    def _remember(self, kind, domain, value, expires):
+        self._memory[(kind, domain)] = (value, expires)
+        self._memory.move_to_end((kind, domain))
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, kind, domain, value):
+        """
+        Stores a signal. None marks a failed lookup, which is only kept in memory
+        for NEGATIVE_TTL seconds.
+        """
+        now = time.time()
+        with self._lock:
+            if value is None:
+                self._remember(kind, domain, None, now + NEGATIVE_TTL)
+                return
+            self._remember(kind, domain, value, now + self.ttls[kind])
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO domain_signals (kind, domain, value, fetched_at) VALUES (?, ?, ?, ?)",
+                    (kind, domain, json.dumps(value, default=_encode), now))
+                self._db.commit()
+
+    def lookup(self, kind, domain, fetch):
+        """
+        Returns the cached signal, calling fetch() on a miss (unless offline).
+
+        fetch() must return None on failure. Concurrent callers asking for the same
+        signal wait for the first lookup instead of issuing their own, for at most
+        the time left on the URL's deadline (DeadlineExceeded is raised then). A
+        result fetched after the deadline has passed may be cut short, so it is
+        returned but not cached.
+        """
+        key = (kind, domain)
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        key_lock = entry[0]
+        try:
+            # Waiting for another URL's lookup counts against this URL's deadline
+            remaining = deadline.remaining()
+            if not key_lock.acquire(timeout=-1 if remaining is None else remaining):
+                raise deadline.DeadlineExceeded(f"timed out waiting for the {kind} lookup of {domain}")
+            try:
+                hit, value = self.get(kind, domain)
+                if hit:
+                    return value
+                if self.offline:
+                    return None
+                value = fetch()
+                if not deadline.expired():
+                    self.put(kind, domain, value)
+                return value
+            finally:
+                key_lock.release()
+        finally:
+            # The lock is dropped once no lookup of the signal is waiting or running
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def stats(self):
+        return {kind: {'hits': self.hits[kind], 'misses': self.misses[kind]}
+                for kind in sorted(set(self.hits) | set(self.misses))}
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache = DomainCache()
+# Caches inherited from the parent of a forked process (see configure_after_fork)
+_inherited = []
+
+
+def configure(path=None, ttls=None, offline=False):
+    """
+    Replaces the process-wide domain cache.
+    """
+    global _cache
+    _cache.close()
+    _cache = DomainCache(path=path, ttls=ttls, offline=offline)
+    return _cache
+
+
+def configure_after_fork(path=None, ttls=None, offline=False):
+    """
+    Replaces the process-wide domain cache in a forked child process with one that
+    has its own SQLite connection. The inherited cache's connection still belongs to
+    the parent, and SQLite connections must not be used or closed across a fork, so
+    it is kept open (and referenced, so that garbage collection does not close it).
+    """
+    global _cache
+    _inherited.append(_cache)
+    _cache = DomainCache(path=path, ttls=ttls, offline=offline)
+    return _cache
+
+
+def get_cache():
+    return _cache
@@ -9,61 +9,439 @@ import whois
 from datetime import datetime
 import socket
 import ssl
-from bs4 import BeautifulSoup, Comment
 import dns.resolver
+import threading
+import time
 from collections import Counter
 
+import numpy as np
+
+import deadline
+import domain_cache
+import feature_registry
+import http_client
+import instrumentation
+import script_cache
+from page_stats import PageStream, parse_page
+
+
+OBFUSCATION_KEYWORDS = re.compile(r'eval\(|Function\(|atob\(', re.IGNORECASE)
+OBFUSCATION_KEYWORDS_BYTES = re.compile(rb'eval\(|Function\(|atob\(', re.IGNORECASE)
+# Characters outside the unreserved and common delimiter set of a URL
+UNUSUAL_SYMBOLS = re.compile(r'[^\w\-._~:/?#&=%]')
+
+_spell_checker = None
+_spell_checker_lock = threading.Lock()
+
+
+def get_spell_checker():
+    """
+    Returns the process-wide SpellChecker, loading its word-frequency dictionary on
+    first use. Call it before forking worker processes so they share the loaded
+    dictionary copy-on-write instead of each loading their own.
+    """
+    global _spell_checker
+    with _spell_checker_lock:
+        if _spell_checker is None:
+            _spell_checker = SpellChecker()
+        return _spell_checker
+
+
+class PageWords:
+    """
+    The distinct (lowercased) words of a page's visible text and its word count,
+    which is all its spelling mistake ratio needs: a page's spelling can be scored
+    later with a batch of other pages (see score_spelling) without keeping its text.
+    """
+
+    __slots__ = ('words', 'count')
+
+    def __init__(self, text):
+        words = text.split()
+        self.count = len(words)
+        self.words = {word.lower() for word in words}
+
+
+def spelling_mistake_ratios(texts):
+    """
+    Calculates the spelling mistake ratio of many texts with a single dictionary
+    pass over the deduplicated set of their words.
+
+    Args:
+        texts (iterable): Texts (or their PageWords) to score, e.g. the visible text of many pages.
+
+    Returns:
+        list: Ratio of distinct misspelled words to total words for each text, rounded to 2 places.
+    """
+    pages = [text if isinstance(text, PageWords) else PageWords(text) for text in texts]
+    unknown = get_spell_checker().unknown(set().union(*(page.words for page in pages)))
+
+    ratios = []
+    for page in pages:
+        # Calculate the ratio of misspelled words
+        if not page.count:
+            ratios.append(0.0)
+            continue
+        ratios.append(round(len(page.words & unknown) / page.count, 2))
+    return ratios
+
+
+def score_spelling(feature_dicts):
+    """
+    Scores the deferred spelling_mistakes_ratio (a PageWords, see URLFeatureExtractor's
+    defer_spelling) of a batch of feature dictionaries in one spelling_mistake_ratios()
+    call, replacing it with the ratio in place.
+
+    Returns:
+        list: The feature dictionaries.
+    """
+    pending = [features for features in feature_dicts
+               if isinstance(features.get('spelling_mistakes_ratio'), PageWords)]
+    if pending:
+        ratios = spelling_mistake_ratios([features['spelling_mistakes_ratio'] for features in pending])
+        for features, ratio in zip(pending, ratios):
+            features['spelling_mistakes_ratio'] = ratio
+    return feature_dicts
+
+
+def lookup_whois(domain):
+    """
+    Returns the WHOIS record for a registered domain (None if the lookup fails).
+
+    Lookups go through the domain cache, so each domain is queried at most once
+    per TTL no matter how many URLs or features ask for it.
+    """
+    def fetch():
+        try:
+            timeout = deadline.timeout(10)
+            with instrumentation.network('whois'):
+                # By default python-whois turns socket errors into an empty record
+                record = whois.whois(domain, timeout=timeout, ignore_socket_errors=False)
+            # A record with no fields is a failed lookup, not an unregistered domain
+            return record if any(record.values()) else None
+        except Exception:
+            # A lookup cut short by the URL's deadline is not cached as a failure
+            deadline.check()
+            return None
+    return domain_cache.get_cache().lookup('whois', domain, fetch)
+
+
+def resolve_dns(domain):
+    """
+    Returns (ttl, number of IPs) for the domain's A record, or None if resolution fails.
+    """
+    def fetch():
+        try:
+            resolver = dns.resolver.Resolver(configure=False)
+            resolver.timeout = deadline.timeout(10)  # Set timeout to 10 seconds (less if the deadline is closer)
+            resolver.lifetime = resolver.timeout  # Set lifetime to the same
+            resolver.nameservers = ['8.8.8.8', '2001:4860:4860::8888',
+                                    '8.8.4.4', '2001:4860:4860::8844']
+
+            with instrumentation.network('dns'):
+                answers = resolver.resolve(domain)
+            return answers.rrset.ttl, len(answers)
+        except Exception:
+            deadline.check()
+            return None
+    return domain_cache.get_cache().lookup('dns', domain, fetch)
+
+
+def peer_certificate(domain, timeout=5):
+    """
+    Returns the certificate served on domain:443, as decoded by SSLSocket.getpeercert().
+    """
+    context = ssl.create_default_context()
+    with socket.create_connection((domain, 443), timeout=timeout) as sock:
+        with context.wrap_socket(sock, server_hostname=domain) as ssock:
+            return ssock.getpeercert()
+
+
+def certificate_start(cert):
+    """
+    Returns the notBefore date of a certificate decoded by SSLSocket.getpeercert().
+    """
+    return datetime.strptime(cert['notBefore'], '%b %d %H:%M:%S %Y %Z')
+
+
+def url_length(url):
+    return len(url)
+
+
+def has_unusual_symbols(url):
+    return 1 if UNUSUAL_SYMBOLS.search(url) else 0
+
+
+def serves_domain_certificate(url, domain):
+    """
+    True if fetching url connects to domain:443 over TLS, so the connection shows
+    the certificate that fetch_certificate_start(domain) would look up.
+    """
+    parsed = urlparse(url)
+    try:
+        port = parsed.port
+    except ValueError:
+        return False
+    return parsed.scheme == 'https' and port in (None, 443) and parsed.hostname == domain.lower()
+
+
+def fetch_certificate_start(domain):
+    """
+    Returns the notBefore date of the certificate served on domain:443, or None on failure.
+
+    A certificate seen by a page fetch from the domain is used when it is cached
+    (see URLFeatureExtractor.cache_page_certificate); otherwise a TLS handshake is made with
+    http_client's connect timeout.
+    """
+    def fetch():
+        try:
+            timeout = deadline.timeout(http_client.get_settings()['connect_timeout'])
+            with instrumentation.network('certificate'):
+                cert = peer_certificate(domain, timeout)
+            return certificate_start(cert)
+        except Exception:
+            deadline.check()
+            return None
+    return domain_cache.get_cache().lookup('certificate', domain, fetch)
+
+
+class HostFeatures:
+    """
+    Host-scoped feature values (WHOIS, DNS, certificate, robots.txt) shared by every
+    URL on the same host, so each is computed once per host instead of once per URL.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+        # Host probes of the async extractor, as asyncio tasks shared by the host's URLs
+        self.probes = {}
+
+    def get(self, name, compute):
+        # Waiting for another URL's lookup counts against this URL's deadline
+        remaining = deadline.remaining()
+        if not self._lock.acquire(timeout=-1 if remaining is None else remaining):
+            raise deadline.DeadlineExceeded(f"timed out waiting for {name}")
+        try:
+            if name not in self._values:
+                value = compute()
+                if deadline.expired():
+                    # The value may come from a probe the deadline cut short, so the
+                    # next URL on the host computes it again
+                    return value
+                self._values[name] = value
+            return self._values[name]
+        finally:
+            self._lock.release()
+
 
 class URLFeatureExtractor:
-    def __init__(self, url):
+    def __init__(self, url, host_features=None, parser=None, defer_spelling=False):
         self.url = url
+        self.parser = parser
+        # Leave spelling_mistakes_ratio as the page's PageWords, for score_spelling()
+        self.defer_spelling = defer_spelling
+        self.host_features = host_features if host_features is not None else HostFeatures()
         self.features = {}
         self.parsed_url = urlparse(url)
         self.domain_info = tldextract.extract(url)
         self.domain = f"{self.domain_info.domain}.{self.domain_info.suffix}" if self.domain_info.suffix else self.domain_info.domain
         self.now = datetime.now()
-        self.response = None
+        self._response = None
+        self._page_stats = None
+        self._page_fetched = False
+        self._js_sizes = None
+        self._form_analysis = None
+        self._page_deadline_exceeded = False
+        self._page_wanted = False  # features that need the page have been requested
+        # Features that fell back to their default because the URL's deadline passed
+        self.missing_features = []
+
+    @property
+    def response(self):
+        """
+        The page's HTTP response (None if the fetch failed). The page is fetched on
+        first use, so features that do not need it never trigger the fetch.
+        """
+        self.ensure_page()
+        return self._response
+
+    @property
+    def page_stats(self):
+        """
+        PageStats of the parsed page (None if the page is unavailable).
+        """
+        self.ensure_page()
+        return self._page_stats
+
+    def ensure_page(self):
+        if not self._page_fetched:
+            self._page_fetched = True
+            self.fetch_page()
+
+    def fetch_page(self):
+        """
+        Fetches the page and parses it into self.page_stats (None if the page is unavailable).
+
+        The body is parsed as it downloads (see page_stats.PageStream) and never kept,
+        so a huge page costs no more memory than its PageStats, and no more than
+        http_client's max_body_bytes of it is read.
+        """
         try:
-            self.response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-            if self.response.status_code == 200:
-                self.soup = BeautifulSoup(self.response.text, 'html.parser')
-            else:
-                self.soup = None
+            stream = PageStream(self.parser)
+            response = http_client.fetch(self.url, sink=stream, headers={"User-Agent": "Mozilla/5.0"})
+            self.set_response(response, stream)
         except Exception as e:
             print(f"Error fetching URL: {e}")
-            self.soup = None
-        # set
+            self.set_page_error(e)
 
-    def extract_url_features(self):
+    def set_page_error(self, error):
         """
-        Extracts all features and stores them in the features dictionary.
+        Records a failed page fetch. A fetch cut off by the deadline leaves the page
+        features missing (see set_missing); any other failure is stored under
+        feature_registry.PAGE_ERROR, so the URL can be told apart from one whose
+        page was fetched.
         """
-        ttl, num_of_ips = self.get_dns_info()
-        self.features['url_len'] = self.get_url_length()
-        self.features['url_whois_info'] = self.has_whois_info()
-        self.features['url_certificate_age'] = self.get_ssl_certificate_age()
-        self.features['dns_TTL'] = ttl
-        self.features['dns_IP_count'] = num_of_ips
-        self.features['domain_registration_length'] = self.get_domain_registration_length()
-        self.features['abnormal_url'] = self.is_abnormal_url()
-        self.features['age_of_domain'] = self.get_domain_age()
-        self.features['is_https'] = self.is_https()
-        self.features['url_unusual_symbols'] = self.has_unusual_symbols()
+        self._page_stats = None
+        self._page_deadline_exceeded = isinstance(error, deadline.DeadlineExceeded)
+        if not self._page_deadline_exceeded:
+            self.features[feature_registry.PAGE_ERROR] = str(error) or type(error).__name__
 
-        # Page Content Features
-        self.extract_page_content_features()
+    def set_response(self, response, stream=None):
+        """
+        Stores the page response and its PageStats.
 
+        Args:
+            response (requests.Response): The page response.
+            stream (PageStream): The stream the body was fed to while it downloaded;
+                without one, the response's body is parsed here.
+        """
+        self._page_fetched = True
+        self._response = response
+        if stream is not None:
+            self._page_stats = stream.close()
+            # Parsing overlaps the download, so this time is also part of network.page
+            instrumentation.record_stage('parse', stream.seconds)
+        elif response.status_code == 200:
+            start = time.perf_counter()
+            self._page_stats = parse_page(response.text, self.parser)
+            instrumentation.record_stage('parse', time.perf_counter() - start)
+            # Features only read the PageStats, so the body is not kept
+            response._content = b''
+        else:
+            self._page_stats = None
+        self.cache_page_certificate(response)
+
+    def cache_page_certificate(self, response):
+        """
+        Caches the certificate of the page's TLS connection as the domain's when the
+        page came from the domain itself, so fetch_certificate_start() needs no
+        handshake of its own.
+        """
+        certificate = getattr(response, 'peer_certificate', None)
+        if not certificate or not serves_domain_certificate(response.url, self.domain):
+            return
+        cache = domain_cache.get_cache()
+        _, not_before = cache.peek('certificate', self.domain)
+        if not_before is None:
+            try:
+                cache.put('certificate', self.domain, certificate_start(certificate))
+            except (KeyError, ValueError):
+                pass
+
+    def release_page(self):
+        """
+        Drops the page's PageStats and response once no more features will be
+        computed, so a finished extractor holds nothing of the page.
+        """
+        self._page_stats = None
+        self._response = None
+
+    def extract_url_features(self, only=None):
+        """
+        Extracts all features (or only the features named in only) and stores them in the features dictionary.
+        """
+        specs = feature_registry.FEATURES if only is None else feature_registry.select(only)
+        self.extract_features(specs)
         return self.features
 
+    def extract_features(self, specs):
+        """
+        Computes the given feature specs in order, skipping features already extracted.
+
+        URL features propagate errors. Page content features behave as one group: the
+        first error skips the remaining ones, and features that need the parsed page
+        are skipped when it is unavailable.
+
+        Under a deadline (see deadline.budget), a feature that still has to wait on
+        the network once the deadline has passed (or was waiting when it passed) gets
+        its spec's default instead and is listed in missing_features, which is also
+        stored in the features under feature_registry.MISSING_FEATURES. Lexical
+        features, and page features once the page is in, are always computed.
+        """
+        page_error = None
+        if any('fetch' in spec.requires for spec in specs):
+            self._page_wanted = True
+        for spec in specs:
+            if spec.name in self.features or (spec.group == 'page' and page_error is not None):
+                continue
+            waits = self.waits_on_network(spec)
+            if waits and deadline.expired():
+                self.set_missing(spec)
+                continue
+            start = time.perf_counter()
+            try:
+                if spec.group == 'page' and 'parse' in spec.requires and self.page_stats is None:
+                    if self._page_deadline_exceeded:
+                        self.set_missing(spec)
+                        continue
+                    raise ValueError("the page could not be fetched or parsed")
+                value = spec.compute(self)
+            except deadline.DeadlineExceeded:
+                self.set_missing(spec)
+                continue
+            except Exception as e:
+                if spec.group != 'page':
+                    raise
+                page_error = e
+                print(f"Error extracting page content features: {e}")
+                continue
+            finally:
+                instrumentation.record_feature(spec.name, time.perf_counter() - start)
+            if waits and deadline.expired():
+                # The value may come from a probe the deadline cut short
+                self.set_missing(spec)
+            else:
+                self.features[spec.name] = value
+        return self.features
+
+    def waits_on_network(self, spec):
+        """
+        True if computing the feature may still wait on the network: network
+        features, and page features until the page has been fetched.
+        """
+        if spec.cost == feature_registry.NETWORK:
+            return True
+        return spec.cost == feature_registry.PAGE and not self._page_fetched
+
+    def set_missing(self, spec):
+        self.features[spec.name] = spec.default
+        self.missing_features.append(spec.name)
+        self.features[feature_registry.MISSING_FEATURES] = self.missing_features
+
+    def compute_feature(self, name):
+        """
+        Extracts a single feature on demand and returns its value (None if it could not be extracted).
+        """
+        self.extract_features([feature_registry.FEATURES_BY_NAME[name]])
+        return self.features.get(name)
+
     def get_url_length(self):
-        return len(self.url)
+        return url_length(self.url)
 
     def get_whois_info(self):
-        # Get WHOIS information
-        try:
-            return whois.whois(self.domain)
-        except Exception:
-            return None
+        # Get WHOIS information (looked up once per registered domain)
+        return lookup_whois(self.domain)
 
     def has_whois_info(self):
         try:
@@ -79,31 +457,27 @@ class URLFeatureExtractor:
         except Exception:
             return 0  # Incomplete WHOIS information due to error
 
+    def certificate_age(self):
+        """
+        url_certificate_age, computed once per host. When the page is wanted anyway
+        and its TLS connection shows the domain's certificate, the page is fetched
+        first so the certificate comes from that connection.
+        """
+        if self._page_wanted and serves_domain_certificate(self.url, self.domain):
+            self.ensure_page()
+        return self.host_features.get('url_certificate_age', self.get_ssl_certificate_age)
+
     def get_ssl_certificate_age(self):
-        try:
-            context = ssl.create_default_context()
-            with socket.create_connection((self.domain, 443), timeout=5) as sock:
-                with context.wrap_socket(sock, server_hostname=self.domain) as ssock:
-                    cert = ssock.getpeercert()
-                    not_before = datetime.strptime(cert['notBefore'], '%b %d %H:%M:%S %Y %Z')
-                    return (self.now - not_before).days
-        except Exception:
+        not_before = fetch_certificate_start(self.domain)
+        if not_before is None:
             return 0
+        return (self.now - not_before).days
 
     def get_dns_info(self):
-        try:
-            resolver = dns.resolver.Resolver(configure=False)
-            resolver.timeout = 10  # Set timeout to 10 seconds
-            resolver.lifetime = 10  # Set lifetime to 10 seconds
-            resolver.nameservers = ['8.8.8.8', '2001:4860:4860::8888',
-                                    '8.8.4.4', '2001:4860:4860::8844']
-
-            answers = resolver.resolve(self.domain)
-            ttl = answers.rrset.ttl
-            num_of_ips = len(answers)
-            return ttl, num_of_ips
-        except Exception:
-            return 0
+        dns_info = resolve_dns(self.domain)
+        if dns_info is None:
+            return 0, 0
+        return dns_info
 
     def get_domain_registration_length(self):
         try:
@@ -118,10 +492,13 @@ class URLFeatureExtractor:
         return 0
 
     def is_abnormal_url(self):
-        whois_info = self.get_whois_info()
-        host_name = whois_info.domain.split('.')[0]
-        if host_name not in self.url:
-            return 1
+        try:
+            whois_info = self.get_whois_info()
+            host_name = whois_info.domain.split('.')[0]
+            if host_name not in self.url:
+                return 1
+        except Exception:
+            pass
         return 0
 
     def get_domain_age(self):
@@ -158,7 +535,7 @@ class URLFeatureExtractor:
 
 
     def has_unusual_symbols(self):
-        return 1 if re.search(r'[^\w\-._~:/?#&=%]', self.url) else 0
+        return has_unusual_symbols(self.url)
 
     def get_js(self):
         """
@@ -170,93 +547,153 @@ class URLFeatureExtractor:
         try:
             # Step 1: Fetch the HTML content of the webpage
             self.response.raise_for_status()  # Raise exception for HTTP errors
-            # Step 2: Parse the HTML for <script> tags
-            scripts = self.soup.find_all('script')
-
-            # Step 3: Extract the script content
-            js_content = []
-            for script in scripts:
-                if script.get('src'):  # External JS
-                    js_url = script.get('src')
+            # Step 2: Collect the <script> tags found while walking the page
+            scripts = self.page_stats.scripts
+
+            # Step 3: Start downloading every external script concurrently
+            sources = []
+            downloads = {}
+            for src, text in scripts:
+                if src:  # External JS
+                    js_url = src
                     if not js_url.startswith(('http://', 'https://')):  # Handle relative URLs
                         js_url = urljoin(self.url, js_url)
+                    if js_url not in downloads:
+                        downloads[js_url] = script_cache.submit(self.fetch_script, js_url)
+                    sources.append((js_url, None))
+                else:  # Inline JS
+                    sources.append((None, text))
 
+            # Step 4: Extract the script content in page order
+            js_content = []
+            for js_url, text in sources:
+                if js_url:
                     try:
-                        js_response = requests.get(js_url, timeout=10)
-                        js_response.raise_for_status()
-                        js_content.append(js_response.text)  # Decode external JS content
+                        js_content.append(deadline.result(downloads[js_url]))  # Decode external JS content
                     except Exception as e:
                         print(f"Failed to fetch external JS ({js_url}): {e}")
-                else:  # Inline JS
-                    if script.text:
-                        js_content.append(script.text)
+                else:
+                    if text:
+                        js_content.append(text)
 
-            # Step 4: Return all JavaScript content
+            # Step 5: Return all JavaScript content
             return js_content
 
         except Exception as e:
             print(f"Error fetching {self.url}: {e}")
             return []
 
+    def fetch_script(self, js_url):
+        """
+        Returns the text of an external script, raising on HTTP errors. Scripts are
+        cached by absolute URL across pages, so shared CDN bundles are downloaded once.
+        """
+        def download(js_url):
+            js_response = http_client.fetch(js_url, probe='script')
+            js_response.raise_for_status()
+            return js_response.text
+        return script_cache.get_script(js_url, download)
+
+    def analyze_script(self, js):
+        """
+        Returns (size in bytes, is obfuscated) for a script. Results are cached by
+        content hash, so a script seen on many pages is only analyzed once.
+        """
+        data = js.encode('utf-8')
+        return script_cache.get_analysis(script_cache.content_hash(data),
+                                         lambda: (len(data), self.is_obfuscated(js, data)))
+
     @staticmethod
-    def calculate_entropy(script):
+    def byte_histogram(data):
+        """
+        Counts how often each byte value occurs in data, in a single vectorized pass.
+        """
+        return np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+
+    @staticmethod
+    def calculate_entropy(script, histogram=None):
         """
         Calculate Shannon entropy of a given script.
 
+        ASCII scripts (one byte per character) are scored from a byte histogram;
+        anything else falls back to counting characters, so the result is always
+        the per-character entropy.
+
         Args:
             script (str): JavaScript code as a string.
+            histogram (numpy.ndarray): Byte histogram of the script, if already
+                computed. Only valid for ASCII scripts.
 
         Returns:
             float: Shannon entropy value of the script.
         """
         if not script:
             return 0
-        counts = Counter(script)
         total = len(script)
+        if histogram is None and script.isascii():
+            histogram = URLFeatureExtractor.byte_histogram(script.encode('ascii'))
+        if histogram is not None:
+            probabilities = histogram[histogram > 0] / total
+            return float(-(probabilities * np.log2(probabilities)).sum())
+        counts = Counter(script)
         entropy = -sum((count / total) * math.log2(count / total) for count in counts.values())
         return entropy
 
-    def is_obfuscated(self, script):
+    def is_obfuscated(self, script, data=None):
+        """
+        Checks whether a script looks obfuscated: high entropy plus either a
+        dynamic-evaluation keyword or almost no whitespace.
+
+        Entropy, whitespace ratio and keyword search all work on the one UTF-8
+        encoding of the script (pass it as data if already encoded).
+        """
         if not script:
             return False
+        if data is None:
+            data = script.encode('utf-8')
+        histogram = self.byte_histogram(data)
+        ascii_only = len(data) == len(script)
 
         # Shannon entropy
-        entropy = self.calculate_entropy(script)
-
-        # Refined keyword matching
-        keyword_match = re.search(r'eval\(|Function\(|atob\(', script, re.IGNORECASE)
-
-        # Minification ratio
-        minified_ratio = len(script.replace(' ', '').replace('\n', '')) / len(script)
+        entropy = self.calculate_entropy(script, histogram if ascii_only else None)
 
         # Adjusted thresholds
         entropy_threshold = 6.0
         minified_threshold = 0.95
 
         # Decision logic
-        if entropy > entropy_threshold:
-            if keyword_match or minified_ratio > minified_threshold:
-                return True  # Obfuscation suspected
+        if entropy <= entropy_threshold:
+            return False
+
+        # Refined keyword matching
+        if ascii_only:
+            keyword_match = OBFUSCATION_KEYWORDS_BYTES.search(data)
+        else:
+            keyword_match = OBFUSCATION_KEYWORDS.search(script)
+
+        # Minification ratio: spaces and newlines are single bytes in UTF-8, so the
+        # histogram counts them exactly even for non-ASCII scripts.
+        minified_ratio = (len(script) - int(histogram[ord(' ')]) - int(histogram[ord('\n')])) / len(script)
+
+        if keyword_match or minified_ratio > minified_threshold:
+            return True  # Obfuscation suspected
         return False
 
     def calculate_script_percentage(self):
-        scripts = self.soup.find_all('script')
-        total_page_size = len(self.response.text)
-        script_size = sum(len(script.text) for script in scripts if script.text)  # Inline JS size
+        scripts = self.page_stats.scripts
+        total_page_size = self.page_stats.source_length
+        script_size = sum(len(text) for _, text in scripts if text)  # Inline JS size
         return round((script_size / total_page_size), 3) if total_page_size > 0 else 0
 
     def calculate_link_percentage(self):
-        total_tags = len(self.soup.find_all())
-        link_tags = len(self.soup.find_all('a'))
+        total_tags = self.page_stats.tag_count
+        link_tags = self.page_stats.anchor_count
         return round((link_tags / total_tags), 3) if total_tags > 0 else 0
 
     def calculate_request_url_percentage(self):
 
         # Gather all resource links
-        links = [link.get('href') for link in self.soup.find_all('a')]
-        images = [img.get('src') for img in self.soup.find_all('img')]
-        scripts = [script.get('src') for script in self.soup.find_all('script')]
-        resources = links + images + scripts
+        resources = self.page_stats.resource_urls
 
         external_links = 0
         total_links = 0
@@ -270,56 +707,32 @@ class URLFeatureExtractor:
 
         return round((external_links / total_links), 3) if total_links > 0 else 0
 
-    @staticmethod
-    def tag_visible(element):
-        """
-        Helper function to check if an HTML element's text is visible.
-        """
-        if element.parent.name in ['style', 'script', 'head', 'title', 'meta', '[document]']:
-            return False
-        if isinstance(element, Comment):
-            return False
-        return True
-
     def extract_visible_text(self):
         """
         Extract visible text from HTML content, excluding script, style, and other non-visible elements.
         """
-        texts = self.soup.find_all(string=True)
-        vis = [texts for text in texts if self.tag_visible(text)]
-        visible_texts = filter(self.tag_visible, texts)
-        return " ".join(t.strip() for t in visible_texts)
+        return self.page_stats.visible_text
 
     @staticmethod
     def calculate_spelling_mistakes(text):
         """
         Calculate the spelling mistake ratio in a given text.
         """
-
-        spell = SpellChecker()
-
-        words = text.split()
-        total_words = len(words)
-        misspelled_words = spell.unknown(words)
-        num_misspelled = len(misspelled_words)
-
-        # Calculate the ratio of misspelled words
-        if total_words == 0:
-            return 0.0
-        misspelled_ratio = num_misspelled / total_words
-        return round(misspelled_ratio, 2)
+        return spelling_mistake_ratios([text])[0]
 
     def get_spelling_mistakes_ratio(self):
         """
         Wrapper function to extract visible text from HTML and calculate the spelling mistake ratio.
         """
         visible_text = self.extract_visible_text()
+        if self.defer_spelling:
+            return PageWords(visible_text)
         misspelled_ratio = self.calculate_spelling_mistakes(visible_text)
         return misspelled_ratio
 
     def get_content_richness(self):
         visible_text = self.extract_visible_text()
-        total_content_size = len(self.response.text)
+        total_content_size = self.page_stats.source_length
         visible_text_size = len(visible_text)
 
         # Calculate content richness as the ratio of visible text size to total content size
@@ -334,7 +747,7 @@ class URLFeatureExtractor:
             robots_url = f"{self.parsed_url.scheme}://{self.parsed_url.netloc}/robots.txt"
 
             # Make an HTTP GET request to check for robots.txt
-            response = requests.get(robots_url, allow_redirects=True)
+            response = http_client.fetch(robots_url, probe='robots', allow_redirects=True)
 
             if response.status_code == 200:
                 return 1  # Robots.txt found
@@ -348,9 +761,9 @@ class URLFeatureExtractor:
     def is_responsive(self):
         try:
             # Parse HTML content
-            responsive_meta = self.soup.find('meta', {'name': 'viewport'})
+            responsive_meta = self.page_stats.meta_tags.get('viewport')
 
-            if responsive_meta and 'content' in responsive_meta.attrs:
+            if responsive_meta and 'content' in responsive_meta:
                 # Optionally validate viewport content
                 content = responsive_meta['content']
                 if 'width=device-width' in content or 'initial-scale' in content:
@@ -364,7 +777,7 @@ class URLFeatureExtractor:
     def has_description(self):
         try:
             # Search for the meta description tag
-            meta_description = self.soup.find('meta', {'name': 'description'})
+            meta_description = self.page_stats.meta_tags.get('description')
 
             # Check if the description exists and has content
             if meta_description and meta_description.get('content'):
@@ -379,7 +792,8 @@ class URLFeatureExtractor:
     def no_of_popup(self):
         try:
             # Find all scripts containing popup-related JavaScript methods
-            popup_scripts = self.soup.find_all('script', string=re.compile(r'window\.open|alert|confirm|prompt'))
+            popup_pattern = re.compile(r'window\.open|alert|confirm|prompt')
+            popup_scripts = [text for _, text in self.page_stats.scripts if text and popup_pattern.search(text)]
 
             # Count the number of such scripts
             popup_count = len(popup_scripts)
@@ -392,7 +806,7 @@ class URLFeatureExtractor:
     def no_of_iframe(self):
         try:
             # Count the number of <iframe> tags
-            iframe_count = len(self.soup.find_all('iframe'))
+            iframe_count = self.page_stats.iframe_count
             return iframe_count
         except Exception as e:
             print('no_of_iframe error: ' + str(e))
@@ -405,7 +819,7 @@ class URLFeatureExtractor:
             # Check for external form submit
             external_form_submit = 0
             for form in forms:
-                action = form.get('action')
+                action = form.action
                 if action and urlparse(action).netloc and urlparse(action).netloc != parsed_url.netloc:
                     external_form_submit = 1
                     break
@@ -421,11 +835,10 @@ class URLFeatureExtractor:
                            'youtube.com']
         try:
 
-            links = self.soup.find_all('a', href=True)
+            links = self.page_stats.anchor_hrefs
             # Check for social media links
             has_social_net = 0
-            for link in links:
-                href = link.get('href')
+            for href in links:
                 if any(social_network in href for social_network in social_networks):
                     has_social_net = 1
                     break
@@ -439,10 +852,8 @@ class URLFeatureExtractor:
     def has_hidden_fields(self):
         try:
 
-            hidden_fields = self.soup.find_all('input', {'type': 'hidden'})
-
             # Check for hidden fields
-            has_hidden = 1 if hidden_fields else 0
+            has_hidden = 1 if self.page_stats.has_hidden_input else 0
             return has_hidden
         except Exception as e:
             print('has_hidden_fields error: ' + str(e))
@@ -455,7 +866,7 @@ class URLFeatureExtractor:
 
             # Check for insecure forms
             for form in forms:
-                action = form.get('action')
+                action = form.action
                 if action and action.startswith('http://'):
                     return 1  # Insecure form found
 
@@ -470,7 +881,7 @@ class URLFeatureExtractor:
         try:
             # Check for relative actions
             for form in forms:
-                action = form.get('action')
+                action = form.action
                 if action and not urlparse(action).netloc:
                     return 1  # Relative form action found
 
@@ -485,7 +896,7 @@ class URLFeatureExtractor:
         try:
             # Check for external actions
             for form in forms:
-                action = form.get('action')
+                action = form.action
                 if action and urlparse(action).netloc and urlparse(action).netloc != parsed_url.netloc:
                     return 1  # External form action found
 
@@ -498,12 +909,11 @@ class URLFeatureExtractor:
     def percentage_of_null_self_redirect_hyperlinks(self):
         try:
 
-            links = self.soup.find_all('a', href=True)
+            links = self.page_stats.anchor_hrefs
 
             # Count self or null redirect links
             null_self_redirect_links = 0
-            for link in links:
-                href = link.get('href')
+            for href in links:
                 if href in ['#', 'javascript:void(0)']:
                     null_self_redirect_links += 1
 
@@ -521,11 +931,8 @@ class URLFeatureExtractor:
     # Feature - Checks if right click is disabled on a website
     def right_click_disabled(self):
         try:
-
-            html_content = self.response.text
-
             # Check if right-click is disabled based on specific JavaScript events
-            if 'event.button==2' in html_content or 'event.button == 2' in html_content:
+            if self.page_stats.right_click_disabled:
                 return 1  # Right click disabled
             else:
                 return 0  # Right click not disabled
@@ -541,7 +948,7 @@ class URLFeatureExtractor:
 
             submit_to_email = 0
             for form in forms:
-                action = form.get('action')
+                action = form.action
                 if action and action.startswith('mailto:'):
                     submit_to_email = 1
                     break
@@ -561,9 +968,9 @@ class URLFeatureExtractor:
 
             # Loop through each form to check its input types
             for form in forms:
-                inputs = form.find_all('input')
+                inputs = form.input_types
                 # Check if all input fields in the form are of type "image"
-                if inputs and all(input_.get('type') == 'image' for input_ in inputs):
+                if inputs and all(input_type == 'image' for input_type in inputs):
                     images_only = 1
                     break
 
@@ -582,8 +989,7 @@ class URLFeatureExtractor:
 
             # Loop through each form and check for password fields
             for form in forms:
-                password_fields = form.find_all('input', {'type': 'password'})
-                if password_fields:
+                if 'password' in form.input_types:
                     has_password = 1
                     break
 
@@ -602,9 +1008,7 @@ class URLFeatureExtractor:
 
             # Loop through each form and check for submit buttons
             for form in forms:
-                inputs = form.find_all('input', {'type': 'submit'})
-                buttons = form.find_all('button', {'type': 'submit'})
-                if inputs or buttons:
+                if 'submit' in form.input_types or form.has_submit_button:
                     has_submit = 1
                     break
 
@@ -630,7 +1034,7 @@ class URLFeatureExtractor:
     """
 
     def get_form_analysis(self):
-        forms = self.soup.find_all('form')
+        forms = self.page_stats.forms
         has_external_form_submit = self.has_external_form_submit(forms, self.parsed_url)
         has_insecure_form = self.has_insecure_form(forms)
         has_relative_form_action = self.has_relative_form_action(forms)
@@ -658,42 +1062,29 @@ class URLFeatureExtractor:
         """
 
     def extract_page_content_features(self):
+        page_specs = [spec for spec in feature_registry.FEATURES if spec.group == 'page']
+        return self.extract_features(page_specs)
 
-        try:
+    def js_sizes(self):
+        """
+        Returns (total, obfuscated) size in KB of the page's JavaScript, computed once.
+        """
+        if self._js_sizes is None:
             all_js = self.get_js()
-            total_js_size = round((sum(len(js.encode('utf-8')) for js in all_js) / 1024), 3) if all_js else 0
-            obfuscated_js_size = round((sum(len(js.encode('utf-8')) for js in all_js if self.is_obfuscated(js)) / 1024),
+            analyses = [self.analyze_script(js) for js in all_js]
+            total_js_size = round((sum(size for size, _ in analyses) / 1024), 3) if all_js else 0
+            obfuscated_js_size = round((sum(size for size, obfuscated in analyses if obfuscated) / 1024),
                                        3) if all_js else 0
-            self.features['js_size'] = total_js_size
-            self.features['js_obfuscated_size'] = obfuscated_js_size
-            self.features['script_percentage'] = self.calculate_script_percentage()
-            self.features['link_percentage'] = self.calculate_link_percentage()
-            self.features['request_url_percentage'] = self.calculate_request_url_percentage()
-            self.features['spelling_mistakes_ratio'] = self.get_spelling_mistakes_ratio()
-            self.features['content_richness'] = self.get_content_richness()
-            self.features['has_robots'] = self.has_robots()
-            self.features['is_responsive'] = self.is_responsive()
-            self.features['has_description'] = self.has_description()
-            self.features['no_of_popup'] = self.no_of_popup()
-            self.features['no_of_iframe'] = self.no_of_iframe()
-            (has_external_form_submit, has_insecure_form, has_relative_form_action,
-             has_external_form_action, has_submit_info_to_email, has_image_only_form,
-             has_password_field, has_submit_button) = self.get_form_analysis()
-
-            self.features['has_external_form_submit'] = has_external_form_submit
-            self.features['has_social_net'] = self.has_social_network()
-            self.features['has_hidden_fields'] = self.has_hidden_fields()
-            self.features['has_insecure_form'] = has_insecure_form
-            self.features['has_relative_form_action'] = has_relative_form_action
-            self.features['has_external_form_action'] = has_external_form_action
-            self.features['percentage_of_null_self_redirect_hyperlinks'] = self.percentage_of_null_self_redirect_hyperlinks()
-            self.features['right_click_disabled'] = self.right_click_disabled()
-            self.features['has_submit_info_to_email'] = has_submit_info_to_email
-            self.features['has_image_only_form'] = has_image_only_form
-            self.features['has_password_field'] = has_password_field
-            self.features['has_submit_button'] = has_submit_button
-        except Exception as e:
-            print(f"Error extracting page content features: {e}")
+            self._js_sizes = (total_js_size, obfuscated_js_size)
+        return self._js_sizes
+
+    def form_analysis(self):
+        """
+        Returns get_form_analysis(), computed once.
+        """
+        if self._form_analysis is None:
+            self._form_analysis = self.get_form_analysis()
+        return self._form_analysis
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,135 @@
+# feature_registry.py
+
+# Cost classes, cheapest first.
+LEXICAL = 'lexical'  # computed from the URL string alone
+PAGE = 'page'  # needs the page fetch (and usually the parsed page)
+NETWORK = 'network'  # needs its own network probe (WHOIS, DNS, TLS, robots.txt, external scripts)
+
+COSTS = (LEXICAL, PAGE, NETWORK)
+
+# Key of the extracted features that lists the features which fell back to their
+# default because the URL's deadline passed (absent when none did).
+MISSING_FEATURES = 'missing_features'
+
+# Key of the extracted features that holds the error of a failed page fetch
+# (absent when the page was fetched). The page features are then left out.
+PAGE_ERROR = 'page_error'
+
+
+class FeatureSpec:
+    """
+    Declares one extracted feature.
+
+    Args:
+        name (str): Feature name (column name in the extracted features).
+        compute (callable): Takes a URLFeatureExtractor and returns the value.
+        cost (str): LEXICAL, PAGE or NETWORK.
+        requires (tuple): Resources the feature depends on: 'fetch' (the page
+            response), 'parse' (the parsed page), 'whois', 'dns', 'certificate',
+            'robots' and 'scripts'.
+        group (str): 'url' features propagate errors; 'page' features are
+            extracted as a group in which the first error skips the rest, and are
+            left out entirely when the page could not be parsed.
+        default: Value used when the URL's deadline passes before the feature could
+            be computed. 0 for every feature: it is what each feature reports when
+            its probe fails, so a partial vector looks like a row with failed probes.
+    """
+
+    def __init__(self, name, compute, cost, requires=(), group='url', default=0):
+        self.name = name
+        self.compute = compute
+        self.cost = cost
+        self.requires = tuple(requires)
+        self.group = group
+        self.default = default
+
+    def __repr__(self):
+        return f"FeatureSpec({self.name!r}, cost={self.cost!r}, requires={self.requires!r})"
+
+
+def _page(name, compute, cost=PAGE, requires=('fetch', 'parse')):
+    return FeatureSpec(name, compute, cost, requires, group='page')
+
+
+def _form(index):
+    return lambda ex: ex.form_analysis()[index]
+
+
+# Every feature, in the order extract_url_features() produces them.
+FEATURES = [
+    FeatureSpec('url_len', lambda ex: ex.get_url_length(), LEXICAL),
+    FeatureSpec('url_whois_info', lambda ex: ex.host_features.get('url_whois_info', ex.has_whois_info),
+                NETWORK, ('whois',)),
+    FeatureSpec('url_certificate_age', lambda ex: ex.certificate_age(), NETWORK, ('certificate',)),
+    FeatureSpec('dns_TTL', lambda ex: ex.host_features.get('dns_info', ex.get_dns_info)[0], NETWORK, ('dns',)),
+    FeatureSpec('dns_IP_count', lambda ex: ex.host_features.get('dns_info', ex.get_dns_info)[1], NETWORK, ('dns',)),
+    FeatureSpec('domain_registration_length',
+                lambda ex: ex.host_features.get('domain_registration_length', ex.get_domain_registration_length),
+                NETWORK, ('whois',)),
+    FeatureSpec('abnormal_url', lambda ex: ex.is_abnormal_url(), NETWORK, ('whois',)),
+    FeatureSpec('age_of_domain', lambda ex: ex.host_features.get('age_of_domain', ex.get_domain_age),
+                NETWORK, ('whois',)),
+    FeatureSpec('is_https', lambda ex: ex.is_https(), PAGE, ('fetch',)),
+    FeatureSpec('url_unusual_symbols', lambda ex: ex.has_unusual_symbols(), LEXICAL),
+
+    # Page content features. get_js() copes with a missing page, so the script sizes
+    # are reported (as 0) even when the page could not be fetched.
+    _page('js_size', lambda ex: ex.js_sizes()[0], NETWORK, ('fetch', 'scripts')),
+    _page('js_obfuscated_size', lambda ex: ex.js_sizes()[1], NETWORK, ('fetch', 'scripts')),
+    _page('script_percentage', lambda ex: ex.calculate_script_percentage()),
+    _page('link_percentage', lambda ex: ex.calculate_link_percentage()),
+    _page('request_url_percentage', lambda ex: ex.calculate_request_url_percentage()),
+    _page('spelling_mistakes_ratio', lambda ex: ex.get_spelling_mistakes_ratio()),
+    _page('content_richness', lambda ex: ex.get_content_richness()),
+    # robots.txt does not depend on the page, but it has always been extracted only
+    # when the page was parsed, and the model was trained that way.
+    _page('has_robots', lambda ex: ex.host_features.get('has_robots', ex.has_robots), NETWORK,
+          ('fetch', 'parse', 'robots')),
+    _page('is_responsive', lambda ex: ex.is_responsive()),
+    _page('has_description', lambda ex: ex.has_description()),
+    _page('no_of_popup', lambda ex: ex.no_of_popup()),
+    _page('no_of_iframe', lambda ex: ex.no_of_iframe()),
+    _page('has_external_form_submit', _form(0)),
+    _page('has_social_net', lambda ex: ex.has_social_network()),
+    _page('has_hidden_fields', lambda ex: ex.has_hidden_fields()),
+    _page('has_insecure_form', _form(1)),
+    _page('has_relative_form_action', _form(2)),
+    _page('has_external_form_action', _form(3)),
+    _page('percentage_of_null_self_redirect_hyperlinks', lambda ex: ex.percentage_of_null_self_redirect_hyperlinks()),
+    _page('right_click_disabled', lambda ex: ex.right_click_disabled()),
+    _page('has_submit_info_to_email', _form(4)),
+    _page('has_image_only_form', _form(5)),
+    _page('has_password_field', _form(6)),
+    _page('has_submit_button', _form(7)),
+]
+
+FEATURES_BY_NAME = {spec.name: spec for spec in FEATURES}
+FEATURE_NAMES = [spec.name for spec in FEATURES]
+
+
+def select(names):
+    """
+    Returns the specs for the given feature names in extraction order, ignoring
+    names that are not extracted features.
+    """
+    names = set(names)
+    return [spec for spec in FEATURES if spec.name in names]
+
+
+def model_feature_names(model):
+    """
+    Returns the extracted features a fitted model consumes, in extraction order.
+    Model inputs that are not extracted features are left out.
+    """
+    return [spec.name for spec in select(model.feature_names_in_)]
+
+
+def cost_summary(names):
+    """
+    Counts the given features per cost class and lists the resources they need.
+    """
+    specs = select(names)
+    return {
+        'features': {cost: sum(1 for spec in specs if spec.cost == cost) for cost in COSTS},
+        'requires': sorted({resource for spec in specs for resource in spec.requires}),
+    }
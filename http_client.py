@@ -0,0 +1,289 @@
+# http_client.py
+import socket
+import threading
+from contextlib import nullcontext
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+from urllib3.util.retry import Retry
+
+import deadline
+import instrumentation
+
+# Defaults for every HTTP fetch made during feature extraction.
+DEFAULT_SETTINGS = {
+    'connect_timeout': 5,  # seconds to establish a connection
+    'read_timeout': 10,  # seconds to wait between bytes of the response
+    'total_timeout': 30,  # seconds a whole fetch (redirects and body included) may take; None for no limit
+    'max_body_bytes': 10 * 1024 * 1024,  # responses are truncated beyond this size
+    'retries': 2,  # retries for failed connects and 502/503/504 responses
+    'backoff_factor': 0.5,  # sleep backoff_factor * 2 ** (retry - 1) seconds between retries
+    'pool_connections': 100,  # number of hosts to keep connection pools for
+    'pool_maxsize': 32,  # keep-alive connections kept per host
+}
+
+CHUNK_SIZE = 64 * 1024
+
+_settings = dict(DEFAULT_SETTINGS)
+_session = None
+_lock = threading.Lock()
+_watch = threading.local()  # .timer: the FetchTimer of the fetch running on this thread
+
+
+class FetchTimer:
+    """
+    Aborts a fetch at a wall-clock limit by shutting down the socket of the
+    connection it is using, which a blocked read then returns from at once. Socket
+    timeouts only bound each single wait, so a response trickling in a byte at a
+    time would otherwise outlast any limit.
+
+    Args:
+        seconds (float): Time the fetch may take, from entering the block.
+    """
+
+    def __init__(self, seconds):
+        self.expired = False
+        self._connection = None
+        self._lock = threading.Lock()
+        self._timer = threading.Timer(seconds, self._expire)
+        self._timer.daemon = True
+        self._previous = None
+
+    def watch(self, connection):
+        """
+        Called with each connection the fetch sends a request on (redirects included).
+        """
+        with self._lock:
+            self._connection = connection
+            if self.expired:
+                raise TimeoutError("fetch time limit passed")
+
+    def _expire(self):
+        with self._lock:
+            self.expired = True
+            sock = getattr(self._connection, 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        self._previous = getattr(_watch, 'timer', None)
+        _watch.timer = self
+        self._timer.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._timer.cancel()
+        _watch.timer = self._previous
+
+
+class _WatchedConnection:
+    # Lets the FetchTimer of the current thread's fetch reach the connection
+    def request(self, *args, **kwargs):
+        timer = getattr(_watch, 'timer', None)
+        if timer is not None:
+            timer.watch(self)
+        return super().request(*args, **kwargs)
+
+
+class _WatchedHTTPConnection(_WatchedConnection, HTTPConnection):
+    pass
+
+
+class _WatchedHTTPSConnection(_WatchedConnection, HTTPSConnection):
+    pass
+
+
+class _HTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _WatchedHTTPConnection
+
+
+class _HTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _WatchedHTTPSConnection
+
+
+_POOL_CLASSES = {'http': _HTTPConnectionPool, 'https': _HTTPSConnectionPool}
+
+
+class _WatchedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections (direct or through a proxy) can be aborted by a FetchTimer.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _POOL_CLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        manager.pool_classes_by_scheme = _POOL_CLASSES
+        return manager
+
+
+def configure(**settings):
+    """
+    Changes the HTTP settings (see DEFAULT_SETTINGS) and rebuilds the shared session.
+    """
+    global _session
+    unknown = set(settings) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown HTTP settings: {sorted(unknown)}")
+    with _lock:
+        _settings.update(settings)
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_settings():
+    return dict(_settings)
+
+
+def get_session():
+    """
+    Returns the process-wide requests.Session, whose connection pools keep
+    connections to each host alive between fetches.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            retry = Retry(total=_settings['retries'], connect=_settings['retries'], read=0,
+                          status=_settings['retries'], status_forcelist=(502, 503, 504),
+                          backoff_factor=_settings['backoff_factor'], allowed_methods=('GET', 'HEAD'),
+                          raise_on_status=False)
+            adapter = _WatchedAdapter(pool_connections=_settings['pool_connections'],
+                                  pool_maxsize=_settings['pool_maxsize'], max_retries=retry)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def peer_certificate(response):
+    """
+    Returns the certificate (as decoded by SSLSocket.getpeercert()) of the TLS
+    connection a streamed response is being read from, or None.
+    """
+    connection = getattr(response.raw, 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is None or not hasattr(sock, 'getpeercert'):
+        return None
+    return sock.getpeercert() or None
+
+
+def check_timer(timer):
+    """
+    Raises DeadlineExceeded if the URL's deadline has passed, or requests.Timeout if
+    the fetch's timer has aborted it.
+    """
+    deadline.check()
+    if timer is not None and timer.expired:
+        raise requests.exceptions.Timeout(f"fetch took longer than {_settings['total_timeout']}s")
+
+
+def read_body(response, size):
+    """
+    Reads up to size bytes of a streamed response's (decoded) body with a single
+    read from the connection, raising the exceptions iter_content() would.
+    """
+    try:
+        return response.raw.read1(size, decode_content=True)
+    except ProtocolError as e:
+        raise requests.exceptions.ChunkedEncodingError(e)
+    except DecodeError as e:
+        raise requests.exceptions.ContentDecodingError(e)
+    except ReadTimeoutError as e:
+        raise requests.exceptions.ConnectionError(e)
+    except urllib3.exceptions.SSLError as e:
+        raise requests.exceptions.SSLError(e)
+
+
+def fetch(url, timeout=None, max_bytes=None, probe='page', sink=None, **kwargs):
+    """
+    GETs a URL through the shared session.
+
+    The body is read in chunks and truncated at max_bytes, so an oversized or
+    endless response cannot exhaust memory. The read timeout only bounds each wait
+    for data, so a FetchTimer also aborts the fetch, even mid-read, once it has
+    taken total_timeout seconds (requests.Timeout is raised). Inside a URL's
+    deadline (see deadline.budget) the timeouts are clipped to the time left, and
+    DeadlineExceeded is raised once it has passed.
+
+    With a sink, the body is handed over chunk by chunk as it arrives instead of
+    being kept: sink.start(response) is called once the headers are in, then
+    sink.feed(chunk) for every chunk of the (truncated) body, and the returned
+    response has an empty body.
+
+    The certificate of the TLS connection the response came over is kept as
+    response.peer_certificate (None over plain HTTP), so it can stand in for a
+    separate TLS probe of the same host.
+
+    Args:
+        url (str): URL to fetch.
+        timeout (float or tuple): Overrides the (connect, read) timeouts.
+        max_bytes (int): Overrides the body size limit.
+        probe (str): What the fetch is for ('page', 'robots', 'script'), for instrumentation.
+        sink: Consumer of the body, e.g. a page_stats.PageStream.
+        **kwargs: Passed on to requests (headers, allow_redirects, ...).
+
+    Returns:
+        requests.Response: The response, with its (possibly truncated) body loaded
+            unless it went to the sink.
+    """
+    if timeout is None:
+        timeout = (_settings['connect_timeout'], _settings['read_timeout'])
+    if max_bytes is None:
+        max_bytes = _settings['max_body_bytes']
+    # Within a URL's deadline, no wait may outlast the time left
+    if isinstance(timeout, tuple):
+        timeout = tuple(deadline.timeout(seconds) for seconds in timeout)
+    else:
+        timeout = deadline.timeout(timeout)
+
+    limit = _settings['total_timeout']
+    if deadline.remaining() is not None:
+        limit = deadline.remaining() if limit is None else min(limit, deadline.remaining())
+    with instrumentation.network(probe) as call, \
+            (FetchTimer(limit) if limit is not None else nullcontext()) as timer:
+        try:
+            response = get_session().get(url, stream=True, timeout=timeout, **kwargs)
+            try:
+                # The connection goes back to the pool once the body is read, so look now
+                response.peer_certificate = peer_certificate(response)
+                if sink is not None:
+                    sink.start(response)
+                chunks = []
+                received = 0
+                while received < max_bytes:
+                    # read1() makes a single read from the socket, so a body trickling
+                    # in is checked against the deadline at every piece of it
+                    chunk = read_body(response, min(CHUNK_SIZE, max_bytes - received))
+                    if not chunk:
+                        break
+                    check_timer(timer)
+                    received += len(chunk)
+                    if sink is not None:
+                        sink.feed(chunk)
+                    else:
+                        chunks.append(chunk)
+                # A body read until the connection closed ends quietly when aborted
+                check_timer(timer)
+                response._content = b''.join(chunks)
+                call.bytes = received
+            finally:
+                # Returns the connection to the pool when the body was read to the end,
+                # and drops it when the body was truncated.
+                response.close()
+        except requests.RequestException:
+            # A timeout clipped by the deadline is reported as the deadline passing,
+            # and a fetch aborted by its timer as a timeout
+            check_timer(timer)
+            raise
+    return response
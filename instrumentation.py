@@ -0,0 +1,278 @@
+# instrumentation.py
+import asyncio
+import contextvars
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import deadline
+
+# Percentiles are computed from a uniform sample of at most this many values per
+# metric, so memory stays bounded on long runs; counts, totals and maxima are exact.
+SAMPLE_SIZE = 10000
+
+PERCENTILES = (50, 95, 99)
+
+
+class Distribution:
+    """
+    Count, total, maximum and a bounded uniform (reservoir) sample of one metric.
+    """
+
+    __slots__ = ('count', 'total', 'max', 'sample', '_random')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sample = []
+        self._random = random.Random(0)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if len(self.sample) < SAMPLE_SIZE:
+            self.sample.append(value)
+        else:
+            slot = self._random.randrange(self.count)
+            if slot < SAMPLE_SIZE:
+                self.sample[slot] = value
+
+    def summary(self):
+        ordered = sorted(self.sample)
+        stats = {'count': self.count, 'total': round(self.total, 6),
+                 'mean': round(self.total / self.count, 6) if self.count else 0.0}
+        for percentile in PERCENTILES:
+            index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+            stats[f'p{percentile}'] = round(ordered[index], 6) if ordered else 0.0
+        stats['max'] = round(self.max, 6)
+        return stats
+
+
+class NetworkCall:
+    """
+    One network wait: set .bytes to the payload size once it is known.
+    """
+
+    __slots__ = ('probe', 'bytes')
+
+    def __init__(self, probe):
+        self.probe = probe
+        self.bytes = 0
+
+
+class URLTrace:
+    """
+    Everything recorded while extracting one URL.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.started = time.time()
+        self.seconds = 0.0
+        self.features = {}  # feature name -> seconds, including the page fetch and parse it triggers
+        self.stages = {}  # stage ('parse') -> seconds
+        self.network = {}  # probe -> seconds waited
+        self.bytes = {}  # probe -> bytes received
+        self.errors = {}  # probe -> failed calls
+        self.timeouts = {}  # probe -> timed out calls
+
+    def to_dict(self):
+        return {'url': self.url, 'started': self.started, 'seconds': round(self.seconds, 6),
+                'features': {name: round(seconds, 6) for name, seconds in self.features.items()},
+                'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+                'network': {probe: round(seconds, 6) for probe, seconds in self.network.items()},
+                'bytes': self.bytes, 'errors': self.errors, 'timeouts': self.timeouts}
+
+
+class Recorder:
+    """
+    Per-run aggregates of every URLTrace, plus the optional JSON Lines trace file.
+    """
+
+    def __init__(self, trace_path=None):
+        self._lock = threading.Lock()
+        self.distributions = {}  # metric name -> Distribution
+        self.errors = {}  # probe -> count
+        self.timeouts = {}  # probe -> count
+        self.bytes = {}  # probe -> total bytes
+        self.urls = 0
+        self._trace_file = open(trace_path, 'a', buffering=1) if trace_path else None
+
+    def _add(self, metric, value):
+        distribution = self.distributions.get(metric)
+        if distribution is None:
+            distribution = self.distributions[metric] = Distribution()
+        distribution.add(value)
+
+    def record_network(self, call, seconds, error):
+        with self._lock:
+            self._add(f'network.{call.probe}', seconds)
+            if call.bytes:
+                self.bytes[call.probe] = self.bytes.get(call.probe, 0) + call.bytes
+            if error == 'timeout':
+                self.timeouts[call.probe] = self.timeouts.get(call.probe, 0) + 1
+            elif error:
+                self.errors[call.probe] = self.errors.get(call.probe, 0) + 1
+
+    def record_url(self, trace):
+        with self._lock:
+            self.urls += 1
+            self._add('url.total', trace.seconds)
+            for name, seconds in trace.features.items():
+                self._add(f'feature.{name}', seconds)
+            for name, seconds in trace.stages.items():
+                self._add(f'stage.{name}', seconds)
+            for probe, seconds in trace.network.items():
+                self._add(f'url_network.{probe}', seconds)
+            if self._trace_file is not None:
+                self._trace_file.write(json.dumps(trace.to_dict()) + '\n')
+
+    def summary(self):
+        with self._lock:
+            return {
+                'urls': self.urls,
+                'metrics': {name: distribution.summary()
+                            for name, distribution in sorted(self.distributions.items())},
+                'bytes': dict(self.bytes),
+                'errors': dict(self.errors),
+                'timeouts': dict(self.timeouts),
+            }
+
+    def close(self):
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = None
+
+
+_enabled = True
+_recorder = Recorder()
+_current = contextvars.ContextVar('url_trace', default=None)
+
+
+def configure(enabled=True, trace_path=None):
+    """
+    Turns instrumentation on or off and starts a new run, optionally appending one
+    JSON line per extracted URL to trace_path.
+    """
+    global _enabled, _recorder
+    _recorder.close()
+    _enabled = enabled
+    _recorder = Recorder(trace_path if enabled else None)
+
+
+@contextmanager
+def trace_url(url):
+    """
+    Records everything that happens inside the block (in this thread, or in tasks
+    and copied contexts started from it) as the trace of one URL.
+    """
+    if not _enabled:
+        yield None
+        return
+    trace = URLTrace(url)
+    token = _current.set(trace)
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.seconds = time.perf_counter() - start
+        _current.reset(token)
+        _recorder.record_url(trace)
+
+
+def record_feature(name, seconds):
+    """
+    Adds the wall time spent computing a feature to the current URL's trace.
+    """
+    trace = _current.get()
+    if trace is not None:
+        trace.features[name] = trace.features.get(name, 0.0) + seconds
+
+
+def record_stage(name, seconds):
+    """
+    Adds the wall time of a processing stage that is not a feature (e.g. 'parse')
+    to the current URL's trace.
+    """
+    trace = _current.get()
+    if trace is not None:
+        trace.stages[name] = trace.stages.get(name, 0.0) + seconds
+
+
+def is_timeout(error):
+    # A probe cancelled because its URL's deadline passed (see
+    # async_feature_extraction.gather_probes) timed out as well
+    return isinstance(error, TimeoutError) or 'Timeout' in type(error).__name__ \
+        or (isinstance(error, asyncio.CancelledError) and deadline.expired())
+
+
+@contextmanager
+def network(probe):
+    """
+    Times a network wait of the given probe type ('page', 'robots', 'script',
+    'whois', 'dns', 'certificate') and counts it as an error or timeout if the
+    block raises. The exception is re-raised.
+    """
+    if not _enabled:
+        yield NetworkCall(probe)
+        return
+    call = NetworkCall(probe)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield call
+    except BaseException as e:
+        error = 'timeout' if is_timeout(e) else 'error'
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _recorder.record_network(call, seconds, error)
+        trace = _current.get()
+        if trace is not None:
+            trace.network[probe] = trace.network.get(probe, 0.0) + seconds
+            if call.bytes:
+                trace.bytes[probe] = trace.bytes.get(probe, 0) + call.bytes
+            if error == 'timeout':
+                trace.timeouts[probe] = trace.timeouts.get(probe, 0) + 1
+            elif error:
+                trace.errors[probe] = trace.errors.get(probe, 0) + 1
+
+
+def summary():
+    """
+    Returns the run's p50/p95/p99 statistics (seconds) for every metric: url.total,
+    feature.<name>, stage.<name>, network.<probe> (per call) and url_network.<probe> (per URL),
+    plus total bytes, error and timeout counts per probe.
+    """
+    return _recorder.summary()
+
+
+def write_summary(path):
+    with open(path, 'w') as file:
+        json.dump(summary(), file, indent=2)
+
+
+def print_summary(top=10):
+    """
+    Prints the per-URL latency and the features and probes with the most total time.
+    """
+    stats = summary()
+    metrics = stats['metrics']
+    if 'url.total' in metrics:
+        url_stats = metrics['url.total']
+        print(f"[INFO] {stats['urls']} URLs: p50 {url_stats['p50']:.3f}s, p95 {url_stats['p95']:.3f}s, "
+              f"p99 {url_stats['p99']:.3f}s")
+    slowest = sorted(((name, metric) for name, metric in metrics.items()
+                      if name.startswith(('feature.', 'stage.', 'network.'))),
+                     key=lambda item: item[1]['total'], reverse=True)[:top]
+    for name, metric in slowest:
+        print(f"[INFO]   {name}: total {metric['total']:.3f}s, p50 {metric['p50']:.4f}s, "
+              f"p95 {metric['p95']:.4f}s, p99 {metric['p99']:.4f}s ({metric['count']} calls)")
+    if stats['errors'] or stats['timeouts']:
+        print(f"[INFO] Network errors: {stats['errors']}, timeouts: {stats['timeouts']}")
+    print(f"[INFO] Bytes fetched: {stats['bytes']}")
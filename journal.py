@@ -0,0 +1,129 @@
+# journal.py
+import hashlib
+import json
+import os
+import time
+
+import feature_registry
+
+
+def url_key(url):
+    """
+    Returns the compact key a URL is indexed under (keeps the index small for huge feeds).
+    """
+    return hashlib.blake2b(url.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def is_complete(features):
+    """
+    True if the features come from a finished extraction: not empty (a failed
+    extraction), without features that fell back to their default under the
+    deadline, and without a failed page fetch.
+    """
+    return bool(features) and feature_registry.MISSING_FEATURES not in features \
+        and feature_registry.PAGE_ERROR not in features
+
+
+class FeatureJournal:
+    """
+    Append-only JSON Lines journal of extracted feature records, keyed by URL, so an
+    interrupted run can resume where it stopped.
+
+    Every record is written as one line ({"url", "features", "extracted_at"}, plus
+    "retry": true for an incomplete extraction, see is_complete) and sync() makes
+    the appended records durable with fsync. A record to retry is never fresh, so
+    its URL is extracted again on the next run. Only the offset and time
+    of the latest record per URL are kept in memory; the features are read back from
+    the file when needed. A record that was cut off by a crash is dropped when the
+    journal is reopened.
+
+    Args:
+        path (str): Journal file; created if missing.
+        max_age (float): Seconds after which a record expires and its URL is
+            extracted again. Records never expire by default.
+    """
+
+    def __init__(self, path, max_age=None):
+        self.path = path
+        self.max_age = max_age
+        self._index = {}  # url_key -> (offset, extracted_at, retry) of the latest record
+        self._file = open(path, 'a+b')
+        self._load()
+
+    def _load(self):
+        self._file.seek(0)
+        offset = 0
+        valid_end = 0
+        for line in self._file:
+            if line.endswith(b'\n'):
+                try:
+                    record = json.loads(line)
+                    self._index[url_key(record['url'])] = (offset, record['extracted_at'], record.get('retry', False))
+                except (ValueError, KeyError) as e:
+                    print(f"[ERROR] Skipping corrupt journal record at byte {offset} of {self.path}: {e}")
+                valid_end = offset + len(line)
+            offset += len(line)
+        if valid_end < offset:
+            print(f"[INFO] Dropping a truncated record at the end of {self.path}")
+            self._file.truncate(valid_end)
+        self._file.seek(0, os.SEEK_END)
+
+    def __len__(self):
+        return len(self._index)
+
+    def is_fresh(self, url, now=None):
+        """
+        True if the URL has a record that has not expired and is not to be retried.
+        """
+        entry = self._index.get(url_key(url))
+        if entry is None or entry[2]:
+            return False
+        if self.max_age is None:
+            return True
+        return (now or time.time()) - entry[1] < self.max_age
+
+    def extracted_at(self, url):
+        """
+        Returns when the URL's latest record was written (epoch seconds), or None.
+        """
+        entry = self._index.get(url_key(url))
+        return entry[1] if entry else None
+
+    def get(self, url):
+        """
+        Returns the features of the URL's latest record, or None.
+        """
+        entry = self._index.get(url_key(url))
+        if entry is None:
+            return None
+        self._file.seek(entry[0])
+        record = json.loads(self._file.readline())
+        self._file.seek(0, os.SEEK_END)
+        return record['features']
+
+    def append(self, url, features, extracted_at=None):
+        """
+        Appends a feature record for the URL (call sync() to make it durable).
+        """
+        extracted_at = extracted_at or time.time()
+        record = {'url': url, 'features': features, 'extracted_at': extracted_at}
+        retry = not is_complete(features)
+        if retry:
+            record['retry'] = True
+        line = json.dumps(record, default=float)
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(line.encode('utf-8', 'surrogatepass') + b'\n')
+        self._index[url_key(url)] = (offset, extracted_at, retry)
+
+    def sync(self):
+        """
+        Flushes appended records and fsyncs them to disk.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
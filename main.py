@@ -1,45 +1,192 @@
 # main.py
-from web_crawler import web_crawler
-from feature_extraction import URLFeatureExtractor
-from model import preprocess_and_classify
+import argparse
+from datetime import datetime
 
-import pandas as pd
+import domain_cache
+import feature_registry
+import http_client
+import instrumentation
+import page_stats
+from web_crawler import iter_urls
+from journal import FeatureJournal
+from model import load_model
+from pipeline import run_pipeline, DEFAULT_BATCH_SIZE
+from sharding import run_shard, run_local_shards, merge_shards
+from url_screen import URLScreen, DEFAULT_LOW, DEFAULT_HIGH
 
-def main():
-    # Step 1: Crawl the web (read URLs from a CSV)
-    urls = web_crawler("testNewURLs.csv")
+def main(csv_file="testNewURLs.csv", workers=8, per_host_limit=2, use_async=False, feature_mode="all",
+         screen=None, batch_size=DEFAULT_BATCH_SIZE, journal_path=None, max_age=None, since=None,
+         input_options=None, deadline=None):
+    # Step 1: Crawl the web (stream URLs from a CSV)
+    print("[INFO] Reading URLs from CSV...")
+    urls = iter_urls(csv_file, **(input_options or {}))
     
-    # Step 2: Extract features for each URL
-    print("\n[INFO] Extracting features from URLs...")
-    extracted_features = []
-    for url in urls:
-        extractor = URLFeatureExtractor(url)
-        features = extractor.extract_url_features()
-        extracted_features.append(features)
-    
-    # Step 3: Save extracted features to CSV
-    features_df = pd.DataFrame(extracted_features)
-    features_df['url'] = urls  # Add the URLs back to the DataFrame
-    features_df.to_csv("extracted_features.csv", index=False)
+    # Steps 2-5: Screen, extract features and classify URLs in micro-batches,
+    # writing both CSVs as results come in
+    if feature_mode == "model":
+        features = feature_registry.model_feature_names(load_model())
+        print(f"[INFO] Extracting only the model's features: {feature_registry.cost_summary(features)}")
+    print(f"\n[INFO] Extracting features and classifying URLs with {workers} workers, "
+          f"{batch_size} URLs per batch...")
+    if deadline is not None:
+        print(f"[INFO] Features not extracted within {deadline}s of a URL's start fall back to their defaults")
+    journal = None
+    if journal_path:
+        journal = FeatureJournal(journal_path, max_age=max_age)
+        print(f"[INFO] Resuming from journal '{journal_path}' ({len(journal)} URLs already extracted)")
+    try:
+        counts = run_pipeline(urls, "extracted_features.csv", "classified_results.csv", batch_size=batch_size,
+                              screen=screen, feature_mode=feature_mode, journal=journal, since=since,
+                              workers=workers, per_host_limit=per_host_limit, use_async=use_async,
+                              deadline=deadline)
+    finally:
+        if journal is not None:
+            journal.close()
     print("[INFO] Features saved to 'extracted_features.csv'")
-    
-    # Step 4: Preprocess features and classify URLs
-    print("\n[INFO] Classifying URLs...")
-    results_df = preprocess_and_classify("extracted_features.csv")
-    
-    # Step 5: Save classified results to a CSV
-    results_df.to_csv("classified_results.csv", index=False)
     print("[INFO] Classification results saved to 'classified_results.csv'")
-    print(results_df)
+    print(f"[INFO] Results: {dict(counts)}")
+    print(f"[INFO] Domain cache stats: {domain_cache.get_cache().stats()}")
+    instrumentation.print_summary()
 
-if __name__ == "__main__":
-    main()
+def main_sharded(csv_file, shards, shard_dir, shard_index=None, processes=None, merge_only=False,
+                 journal_path=None, max_age=None, input_options=None, shard_by="domain", **pipeline_options):
+    # A single shard (e.g. one machine of a multi-node run): only write its shard files
+    if shard_index is not None and not merge_only:
+        print(f"[INFO] Running shard {shard_index} of {shards} into '{shard_dir}'...")
+        counts = run_shard(csv_file, shard_index, shards, shard_dir, input_options=input_options,
+                           journal_path=journal_path, max_age=max_age, shard_by=shard_by, **pipeline_options)
+        print(f"[INFO] Shard {shard_index} results: {dict(counts)}")
+        instrumentation.print_summary()
+        return
 
+    # All shards as local processes, then the deterministic merge
+    if not merge_only:
+        print(f"[INFO] Running {shards} shards in local processes into '{shard_dir}'...")
+        run_local_shards(csv_file, shards, shard_dir, processes, input_options=input_options,
+                         journal_path=journal_path, max_age=max_age, shard_by=shard_by, **pipeline_options)
+    rows = merge_shards(shards, shard_dir, "extracted_features.csv", "classified_results.csv")
+    print(f"[INFO] Merged {rows} results from {shards} shards into 'classified_results.csv'")
 
-# main.py
-# import json
-# from web_crawler import web_crawler
-# from feature_extraction import URLFeatureExtractor
+def parse_time(value):
+    """
+    Parses an ISO date/time or epoch seconds into epoch seconds.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time {value!r}; expected ISO date/time or epoch seconds")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract URL features and classify URLs as spam or ham.")
+    parser.add_argument("csv_file", nargs="?", default="testNewURLs.csv", help="CSV file with a 'url' column (.gz, .bz2 and .xz are decompressed on the fly)")
+    parser.add_argument("--dedupe", action="store_true", help="skip URLs that already appeared in the input")
+    parser.add_argument("--normalize", action="store_true",
+                        help="normalize URLs (lowercase scheme and host, drop default ports and fragments)")
+    parser.add_argument("--start", type=int, default=0, help="first input row to process")
+    parser.add_argument("--stop", type=int, help="input row to stop before")
+    parser.add_argument("--shards", type=int, default=1, help="split the input into this many shards")
+    parser.add_argument("--shard-index", type=int, help="shard to process (0-based)")
+    parser.add_argument("--shard-by", choices=("domain", "line"), default="domain",
+                        help="assign URLs to shards by registered domain hash or by row index")
+    parser.add_argument("--shard-dir",
+                        help="sharded execution: write per-shard CSVs here (all shards as local processes "
+                             "unless --shard-index is given) and merge them into the usual output files")
+    parser.add_argument("--processes", type=int, help="local shard processes (default: one per shard)")
+    parser.add_argument("--merge-shards", action="store_true",
+                        help="only merge the per-shard CSVs in --shard-dir (after a multi-node run)")
+    parser.add_argument("--workers", type=int, default=8, help="number of concurrent extraction workers")
+    parser.add_argument("--per-host-limit", type=int, default=2,
+                        help="maximum concurrent extractions against a single host")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="run all network probes on one asyncio event loop (--workers sets the concurrency)")
+    parser.add_argument("--cache-path", default="domain_cache.sqlite",
+                        help="SQLite file caching WHOIS, DNS and certificate lookups across runs ('' to disable)")
+    parser.add_argument("--offline", action="store_true",
+                        help="answer WHOIS, DNS and certificate lookups from the cache only")
+    parser.add_argument("--connect-timeout", type=float, default=5, help="HTTP connect timeout in seconds")
+    parser.add_argument("--read-timeout", type=float, default=10, help="HTTP read timeout in seconds")
+    parser.add_argument("--total-timeout", type=float, default=30,
+                        help="seconds a whole HTTP fetch (redirects and body included) may take")
+    parser.add_argument("--max-body-mb", type=float, default=10,
+                        help="MB of a page or script body that is read; the rest is ignored")
+    parser.add_argument("--deadline", type=float,
+                        help="seconds each URL's extraction may take; features still waiting on the network "
+                             "then fall back to their defaults and are listed in a missing_features column")
+    parser.add_argument("--trace", help="append one JSON line of timings per extracted URL to this file")
+    parser.add_argument("--timing-summary",
+                        help="write p50/p95/p99 timings per feature and probe, bytes and error counts as JSON")
+    parser.add_argument("--parser", choices=page_stats.PARSERS, default="html.parser",
+                        help="HTML parser backend ('lxml' and 'selectolax' are C-based and much faster)")
+    parser.add_argument("--features", dest="feature_mode", choices=("all", "model", "tree"), default="all",
+                        help="extract every feature, only the model's features, or only the features on "
+                             "each URL's decision path (tree; not supported with --async)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="URLs per micro-batch; results are written as each batch completes")
+    parser.add_argument("--journal", help="JSON Lines journal of extracted features; a rerun resumes from it "
+                                              "and only extracts new, expired or incomplete URLs")
+    parser.add_argument("--max-age", type=float, help="hours after which journal records expire and are re-extracted")
+    parser.add_argument("--since", type=parse_time,
+                        help="with --journal, only output URLs extracted at or after this time "
+                             "(ISO date/time or epoch seconds)")
+    parser.add_argument("--screen", action="store_true",
+                        help="score URLs from the URL string first and only extract features for uncertain ones "
+                             "(requires --screen-model, --screen-low or --screen-high)")
+    parser.add_argument("--screen-model", help="classifier trained on the lexical URL features (joblib file)")
+    parser.add_argument("--screen-low", type=float,
+                        help=f"spam score at or below which the screen classifies a URL as ham "
+                             f"(default: {DEFAULT_LOW})")
+    parser.add_argument("--screen-high", type=float,
+                        help=f"spam score at or above which the screen classifies a URL as spam "
+                             f"(default: {DEFAULT_HIGH} with --screen-model; without one, no URL is "
+                             f"screened as spam unless this is given)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.use_async and args.feature_mode == "tree":
+        raise SystemExit("[ERROR] --features tree is not supported with --async")
+    if args.since is not None and not args.journal:
+        raise SystemExit("[ERROR] --since requires --journal")
+    if args.merge_shards and not args.shard_dir:
+        raise SystemExit("[ERROR] --merge-shards requires --shard-dir")
+    if args.shards > 1 and args.shard_index is None and not args.shard_dir:
+        raise SystemExit("[ERROR] --shards requires --shard-index (one shard) or --shard-dir (all shards)")
+    if args.shard_index is not None and not 0 <= args.shard_index < args.shards:
+        raise SystemExit(f"[ERROR] --shard-index must be between 0 and {args.shards - 1}")
+    domain_cache.configure(path=args.cache_path or None, offline=args.offline)
+    page_stats.set_default_parser(args.parser)
+    http_client.configure(connect_timeout=args.connect_timeout, read_timeout=args.read_timeout,
+                          total_timeout=args.total_timeout,
+                          max_body_bytes=int(args.max_body_mb * 1024 * 1024))
+    instrumentation.configure(trace_path=args.trace)
+    screen = None
+    if args.screen:
+        try:
+            screen = URLScreen(args.screen_model, args.screen_low, args.screen_high)
+        except ValueError as e:
+            raise SystemExit(f"[ERROR] {e}")
+    pipeline_options = dict(workers=args.workers, per_host_limit=args.per_host_limit, use_async=args.use_async,
+                            feature_mode=args.feature_mode, screen=screen, batch_size=args.batch_size,
+                            since=args.since, deadline=args.deadline)
+    max_age = args.max_age * 3600 if args.max_age else None
+    input_options = dict(dedupe=args.dedupe, normalize=args.normalize, start=args.start, stop=args.stop)
+    try:
+        if args.shard_dir:
+            main_sharded(args.csv_file, args.shards, args.shard_dir, args.shard_index, args.processes,
+                         args.merge_shards, journal_path=args.journal, max_age=max_age,
+                         input_options=input_options, shard_by=args.shard_by, **pipeline_options)
+        else:
+            input_options.update(shards=args.shards, shard_index=args.shard_index or 0, shard_by=args.shard_by)
+            main(args.csv_file, journal_path=args.journal, max_age=max_age, input_options=input_options,
+                 **pipeline_options)
+    finally:
+        if args.timing_summary:
+            instrumentation.write_summary(args.timing_summary)
+        instrumentation.configure(enabled=False)  # closes the trace file
 
 # if __name__ == "__main__":
 #     # Step 1: Crawl the web (read from CSV in this case)
@@ -1,53 +1,250 @@
+import numpy as np
 import pandas as pd
 import joblib
 
-def preprocess_and_classify(features_csv):
+import feature_registry
+
+MODEL_PATH = 'decision_tree_model.pkl'
+
+_models = {}
+_compiled = {}
+
+def load_model(path=MODEL_PATH):
     """
-    Reads extracted features, preprocesses them, and classifies URLs as spam or ham.
+    Loads a pre-trained model, once per process.
     """
-    # Step 1: Load extracted features (with URLs)
-    test_df = pd.read_csv(features_csv)
+    if path not in _models:
+        print("[INFO] Loading pre-trained model...")
+        _models[path] = joblib.load(path)
+    return _models[path]
 
-    # Debug: Check the first few rows of the dataset to verify 'url' column
-    print("Dataset Preview:")
-    print(test_df.head())
+class CompiledTree:
+    """
+    A fitted DecisionTreeClassifier flattened into plain arrays, with the mapping
+    from extracted feature names to tree columns worked out once, so rows can be
+    scored without building and aligning a DataFrame.
 
-    # Ensure the dataset contains the 'url' column
-    if 'url' not in test_df.columns:
-        raise KeyError("The 'url' column is missing from the dataset. Check the CSV file.")
+    Predictions match DecisionTreeClassifier.predict(): values are compared as
+    float32 against the split thresholds and missing values (NaN) follow the
+    tree's missing value direction. Model features that are never extracted
+    count as 0, as in align_features().
+    """
 
-    # Separate the 'url' column (to attach later)
-    urls = test_df['url']
-    features_df = test_df.drop(columns=['url'])  # Drop the 'url' column to keep only features
+    def __init__(self, model):
+        tree = model.tree_
+        self.feature_names = list(model.feature_names_in_)
+        self.left = tree.children_left.copy()
+        self.right = tree.children_right.copy()
+        self.feature = tree.feature.copy()
+        self.threshold = tree.threshold.copy()
+        missing_go_to_left = getattr(tree, 'missing_go_to_left', None)
+        if missing_go_to_left is None:
+            missing_go_to_left = np.zeros(tree.node_count, dtype=np.uint8)
+        self.missing_left = missing_go_to_left.astype(bool)
+        classes = model.classes_[np.argmax(tree.value[:, 0, :], axis=1)]
+        self.labels = np.array(["ham" if cls == 0 else "spam" for cls in classes])
+        # Extracted features only; the others stay 0
+        self.extracted = [name in feature_registry.FEATURES_BY_NAME for name in self.feature_names]
+        # Python lists are faster than NumPy indexing for walking a handful of rows
+        self._nodes = list(zip(self.left.tolist(), self.right.tolist(), self.feature.tolist(),
+                               self.threshold.tolist(), self.missing_left.tolist()))
+        self._labels = self.labels.tolist()
 
-    # Step 2: Load the pre-trained model
-    print("[INFO] Loading pre-trained model...")
-    model = joblib.load('decision_tree_model.pkl')
+    def row_values(self, features, fill_missing=None):
+        """
+        Returns the model's input row for one feature dictionary as float32 values.
+        """
+        missing = np.nan if fill_missing is None else fill_missing
+        values = [features.get(name, missing) if extracted else 0
+                  for name, extracted in zip(self.feature_names, self.extracted)]
+        return np.array([missing if value is None else value for value in values], dtype=np.float32)
 
+    def predict_row(self, values):
+        """
+        Returns the label for one input row (float32 values in model column order).
+        """
+        node = 0
+        nodes = self._nodes
+        left, right, feature, threshold, missing_left = nodes[node]
+        while left != -1:
+            value = values[feature]
+            if value != value:
+                node = left if missing_left else right
+            else:
+                node = left if value <= threshold else right
+            left, right, feature, threshold, missing_left = nodes[node]
+        return self._labels[node]
+
+    def predict_rows(self, feature_dicts, fill_missing=None):
+        """
+        Returns the labels for a list of feature dictionaries.
+        """
+        return [self.predict_row(self.row_values(features, fill_missing).tolist()) for features in feature_dicts]
+
+    def predict_matrix(self, X):
+        """
+        Returns the labels for a matrix whose columns are in model.feature_names_in_ order.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))
+        nodes = np.zeros(len(X), dtype=np.intp)
+        active = self.left[nodes] != -1
+        while active.any():
+            current = nodes[active]
+            values = X[rows[active], self.feature[current]]
+            go_left = np.where(np.isnan(values), self.missing_left[current], values <= self.threshold[current])
+            nodes[active] = np.where(go_left, self.left[current], self.right[current])
+            active = self.left[nodes] != -1
+        return self.labels[nodes]
+
+def compile_tree(model):
+    """
+    Returns the CompiledTree of a model, compiling it on first use.
+    """
+    key = id(model)
+    if key not in _compiled or _compiled[key][0] is not model:
+        _compiled[key] = (model, CompiledTree(model))
+    return _compiled[key][1]
+
+def classify_lazily(extractor, model=None):
+    """
+    Classifies one URL by walking the decision tree and extracting only the features
+    tested on the path the sample actually takes, so features on branches the tree
+    can no longer reach are never computed.
+
+    A feature that cannot be extracted follows the node's missing value direction,
+    as in CompiledTree.predict_row(), so the URL gets the label classify_features()
+    gives its extracted features. Model features that are never extracted count as 0.
+
+    Args:
+        extractor (URLFeatureExtractor): Extractor for the URL; the features computed
+            on the way are left in extractor.features.
+        model (DecisionTreeClassifier): The model; defaults to load_model().
+
+    Returns:
+        str: "ham" or "spam".
+    """
+    tree = compile_tree(model if model is not None else load_model())
+    node = 0
+    while tree.left[node] != -1:
+        column = tree.feature[node]
+        name = tree.feature_names[column]
+        value = None
+        if not tree.extracted[column]:
+            value = 0
+        else:
+            try:
+                value = extractor.compute_feature(name)
+            except Exception as e:
+                print(f"[ERROR] Could not extract {name} for {extractor.url}: {e}")
+        if value is None or value != value:
+            go_left = tree.missing_left[node]
+        else:
+            # The tree compares float32 values, like DecisionTreeClassifier.predict().
+            go_left = np.float32(value) <= tree.threshold[node]
+        node = tree.left[node] if go_left else tree.right[node]
+    return str(tree.labels[node])
+
+def align_features(features_df, model, fill_missing=None, verbose=False):
+    """
+    Aligns extracted features to the columns the model was trained on: features the
+    model expects but were never extracted are added as 0, extra features are dropped
+    and the columns are put in training order.
+
+    Args:
+        features_df (pd.DataFrame): Extracted features, one row per URL.
+        model: The fitted model.
+        fill_missing (float): Value for features missing from individual rows. By
+            default they are left to the model's own missing value handling.
+        verbose (bool): Report the added and dropped features.
+
+    Returns:
+        pd.DataFrame: The aligned features.
+    """
     # Get the list of features that the model was trained on
     trained_features = model.feature_names_in_
 
-    # Step 3: Align the features in the test set to match the training set
     # Add missing features in the test set
     missing_features = set(trained_features) - set(features_df.columns)
     if missing_features:
-        print(f"[INFO] Adding missing features: {missing_features}")
+        if verbose:
+            print(f"[INFO] Adding missing features: {missing_features}")
         for feature in missing_features:
             features_df[feature] = 0  # Add missing features with value 0
 
     # Drop extra features in the test set
     extra_features = set(features_df.columns) - set(trained_features)
     if extra_features:
-        print(f"[INFO] Dropping extra features: {extra_features}")
-        features_df.drop(columns=extra_features, inplace=True)
+        if verbose:
+            print(f"[INFO] Dropping extra features: {extra_features}")
+        features_df = features_df.drop(columns=extra_features)
 
     # Reorder columns to match the training set
     features_df = features_df[trained_features]
+    if fill_missing is not None:
+        features_df = features_df.fillna(fill_missing)
+    return features_df
+
+def predict_labels(features_df, model):
+    """
+    Predicts "ham" or "spam" for every row of aligned features.
+    """
+    predictions = model.predict(features_df)
+    return ["ham" if pred == 0 else "spam" for pred in predictions]
+
+def classify_features(feature_dicts, model=None, fill_missing=None):
+    """
+    Classifies a batch of extracted feature dictionaries without a CSV round trip
+    or a DataFrame, using the model's CompiledTree.
+
+    Each row is classified on its own, so it gets the same label in any batch:
+    features missing from a row are left to the model's missing value handling
+    (or set to fill_missing).
+
+    Args:
+        feature_dicts (list): Feature dictionaries, one per URL.
+        model: The fitted model; defaults to load_model().
+        fill_missing (float): Value for features missing from individual rows.
+
+    Returns:
+        list: "ham" or "spam" for every row.
+    """
+    model = model if model is not None else load_model()
+    return compile_tree(model).predict_rows(feature_dicts, fill_missing)
+
+def preprocess_and_classify(features_csv, fill_missing=None):
+    """
+    Reads extracted features, preprocesses them, and classifies URLs as spam or ham.
+
+    Args:
+        features_csv (str): CSV of extracted features with a 'url' column.
+        fill_missing (float): Value for features missing from individual rows. By
+            default they are left to the model's own missing value handling.
+    """
+    # Step 1: Load extracted features (with URLs)
+    test_df = pd.read_csv(features_csv)
+
+    # Debug: Check the first few rows of the dataset to verify 'url' column
+    print("Dataset Preview:")
+    print(test_df.head())
+
+    # Ensure the dataset contains the 'url' column
+    if 'url' not in test_df.columns:
+        raise KeyError("The 'url' column is missing from the dataset. Check the CSV file.")
+
+    # Separate the 'url' column (to attach later)
+    urls = test_df['url']
+    features_df = test_df.drop(columns=['url'])  # Drop the 'url' column to keep only features
+
+    # Step 2: Load the pre-trained model
+    model = load_model()
+
+    # Step 3: Align the features in the test set to match the training set
+    features_df = align_features(features_df, model, fill_missing, verbose=True)
 
     # Step 4: Predict the labels
     print("[INFO] Predicting labels...")
-    predictions = model.predict(features_df)
-    labels = ["ham" if pred == 0 else "spam" for pred in predictions]
+    labels = predict_labels(features_df, model)
 
     # Step 5: Create a results DataFrame
     results_df = pd.DataFrame({
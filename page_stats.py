@@ -0,0 +1,495 @@
+# page_stats.py
+import codecs
+import io
+import re
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from bs4 import BeautifulSoup, Comment, Tag
+from bs4.builder import HTMLParserTreeBuilder
+from bs4.builder._htmlparser import BeautifulSoupHTMLParser
+from requests.compat import chardet
+
+# Parser backends accepted by parse_page().
+PARSERS = ('html.parser', 'lxml', 'selectolax')
+
+# Text directly inside these elements is not visible on the rendered page.
+INVISIBLE_PARENTS = ('style', 'script', 'head', 'title', 'meta', '[document]')
+
+# Page source that disables the context menu (right_click_disabled).
+RIGHT_CLICK_HANDLERS = ('event.button==2', 'event.button == 2')
+_RIGHT_CLICK_OVERLAP = max(len(handler) for handler in RIGHT_CLICK_HANDLERS) - 1
+
+# Elements an HTML5 parser (lxml, lexbor) inserts where the markup leaves them out,
+# e.g. a <tbody> around table rows. html.parser never inserts any, so the other
+# backends report only as many of each as the source opens (see explicit_tags()).
+IMPLIED_TAGS = ('html', 'head', 'body', 'tbody', 'colgroup')
+_IMPLIED_START_TAG = re.compile(r'<(html|head|body|tbody|colgroup)[\s/>]', re.IGNORECASE)
+
+_default_parser = 'html.parser'
+
+
+class FormStats:
+    """
+    What the page content features need to know about one <form>.
+    """
+
+    def __init__(self, action):
+        self.action = action
+        self.input_types = []  # type attribute of every <input> inside the form (None if missing)
+        self.has_submit_button = False  # a <button type="submit"> inside the form
+
+
+class PageStats:
+    """
+    Counters and collections behind the page content features, accumulated in a
+    single walk over the parsed document.
+
+    The walker reports the document as start_tag / end_tag / text events in
+    document order, so every feature is derived from one traversal instead of a
+    separate find_all() per feature. The events do not depend on the parser that
+    produced the tree, which keeps the feature code independent of the backend.
+    """
+
+    def __init__(self):
+        self.tag_count = 0
+        self.anchor_count = 0
+        self.iframe_count = 0
+        self.has_hidden_input = False
+        self.anchor_hrefs = []  # href of every <a> that has one
+        self.resource_urls = []  # <a href>, <img src> and <script src> values, in document order
+        self.scripts = []  # [src, text] for every <script>, in document order
+        self.forms = []
+        self.meta_tags = {}  # attributes of the first <meta> with each name
+        self.source_length = 0  # characters of page source
+        self.right_click_disabled = False  # the source contains one of RIGHT_CLICK_HANDLERS
+        self._source_tail = ''
+        self._visible_text = io.StringIO()  # stripped visible text nodes, space separated
+        self._visible_text_nodes = 0
+        self._visible_text_value = None
+        self._open_tags = []
+        self._open_forms = []
+        self._open_script = None
+
+    def scan_source(self, text):
+        """
+        Counts a piece of the page source, in order. The source can be scanned in
+        any number of pieces, so a page is never needed as one string.
+        """
+        self.source_length += len(text)
+        if not self.right_click_disabled:
+            # Keep the end of the previous piece: a handler may straddle two pieces
+            window = self._source_tail + text
+            self.right_click_disabled = any(handler in window for handler in RIGHT_CLICK_HANDLERS)
+            self._source_tail = window[-_RIGHT_CLICK_OVERLAP:]
+
+    def start_tag(self, name, attrs):
+        self.tag_count += 1
+        self._open_tags.append(name)
+        if name == 'a':
+            self.anchor_count += 1
+            href = attrs.get('href')
+            if href is not None:
+                self.anchor_hrefs.append(href)
+            if href:
+                self.resource_urls.append(href)
+        elif name == 'img':
+            if attrs.get('src'):
+                self.resource_urls.append(attrs.get('src'))
+        elif name == 'script':
+            if attrs.get('src'):
+                self.resource_urls.append(attrs.get('src'))
+            self._open_script = [attrs.get('src'), '']
+            self.scripts.append(self._open_script)
+        elif name == 'iframe':
+            self.iframe_count += 1
+        elif name == 'form':
+            form = FormStats(attrs.get('action'))
+            self.forms.append(form)
+            self._open_forms.append(form)
+        elif name == 'input':
+            input_type = attrs.get('type')
+            if input_type == 'hidden':
+                self.has_hidden_input = True
+            for form in self._open_forms:
+                form.input_types.append(input_type)
+        elif name == 'button':
+            if attrs.get('type') == 'submit':
+                for form in self._open_forms:
+                    form.has_submit_button = True
+        elif name == 'meta':
+            meta_name = attrs.get('name')
+            if meta_name is not None and meta_name not in self.meta_tags:
+                self.meta_tags[meta_name] = attrs
+
+    def end_tag(self, name):
+        if self._open_tags:
+            self._open_tags.pop()
+        if name == 'form' and self._open_forms:
+            self._open_forms.pop()
+        elif name == 'script':
+            self._open_script = None
+
+    def text(self, data, is_comment=False):
+        if self._open_script is not None:
+            self._open_script[1] += data
+        parent = self._open_tags[-1] if self._open_tags else '[document]'
+        if not is_comment and parent not in INVISIBLE_PARENTS:
+            if self._visible_text_nodes:
+                self._visible_text.write(' ')
+            self._visible_text.write(data.strip())
+            self._visible_text_nodes += 1
+
+    @property
+    def visible_text(self):
+        """
+        Visible text of the page: every visible text node, stripped and joined by a space.
+
+        Text nodes are streamed into one buffer during the walk, so the page's text
+        is never held as a list of pieces; the joined string is built once and cached.
+        """
+        if self._visible_text_value is None:
+            self._visible_text_value = self._visible_text.getvalue()
+            self._visible_text.close()
+        return self._visible_text_value
+
+
+def explicit_tags(html):
+    """
+    Counts the start tags of IMPLIED_TAGS written in a page's source.
+    """
+    return Counter(name.lower() for name in _IMPLIED_START_TAG.findall(html))
+
+
+def _reported(name, explicit):
+    # The first elements of a name are taken to be the ones the source opened
+    if explicit is None or name not in IMPLIED_TAGS:
+        return True
+    if explicit[name]:
+        explicit[name] -= 1
+        return True
+    return False
+
+
+def walk_soup(soup, stats, explicit=None):
+    """
+    Walks a BeautifulSoup tree once, reporting it to stats as events. Given the
+    page's explicit_tags(), elements the parser inserted are left out (their
+    contents are still reported).
+    """
+    open_tags = []  # (element, reported)
+    for element in soup.descendants:
+        # descendants is a pre-order traversal: close every open tag that is not
+        # an ancestor of the current element.
+        parent = element.parent
+        while open_tags and open_tags[-1][0] is not parent:
+            tag, reported = open_tags.pop()
+            if reported:
+                stats.end_tag(tag.name)
+        if isinstance(element, Tag):
+            reported = _reported(element.name, explicit)
+            if reported:
+                stats.start_tag(element.name, element.attrs)
+            open_tags.append((element, reported))
+        else:
+            stats.text(element, isinstance(element, Comment))
+    while open_tags:
+        tag, reported = open_tags.pop()
+        if reported:
+            stats.end_tag(tag.name)
+
+
+def walk_selectolax(document, stats, explicit=None):
+    """
+    Walks a selectolax (lexbor) document once, reporting it to stats as events.
+    Given the page's explicit_tags(), elements the parser inserted are left out
+    (their contents are still reported).
+    """
+    node = document.child
+    open_nodes = []  # (node, reported)
+    while node is not None:
+        tag = node.tag
+        if tag == '-text':
+            stats.text(node.text_content)
+        elif tag == '-comment':
+            stats.text(node.text_content or '', True)
+        elif not tag.startswith('-'):
+            reported = _reported(tag, explicit)
+            if reported:
+                attrs = {key: '' if value is None else value for key, value in node.attributes.items()}
+                stats.start_tag(tag, attrs)
+            if node.child is not None:
+                open_nodes.append((node, reported))
+                node = node.child
+                continue
+            if reported:
+                stats.end_tag(tag)
+        # Move to the next sibling, closing finished ancestors on the way up.
+        while node.next is None and open_nodes:
+            node, reported = open_nodes.pop()
+            if reported:
+                stats.end_tag(node.tag)
+        node = node.next
+
+
+def set_default_parser(parser):
+    """
+    Sets the parser backend used when parse_page() is not given one.
+    """
+    global _default_parser
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown parser {parser!r}; expected one of {PARSERS}")
+    _default_parser = parser
+
+
+def _parse_document(html, parser, stats):
+    if parser == 'html.parser':
+        walk_soup(BeautifulSoup(html, parser), stats)
+    elif parser == 'lxml':
+        walk_soup(BeautifulSoup(html, parser), stats, explicit_tags(html))
+    elif parser == 'selectolax':
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError as e:
+            raise ImportError("The 'selectolax' parser requires the selectolax package") from e
+        walk_selectolax(LexborHTMLParser(html).root.parent, stats, explicit_tags(html))
+    else:
+        raise ValueError(f"Unknown parser {parser!r}; expected one of {PARSERS}")
+
+
+def parse_page(html, parser=None):
+    """
+    Parses an HTML document with the chosen backend and returns its PageStats.
+
+    On well-formed pages the backends agree, except that lexbor drops or merges
+    whitespace-only text around <html> and <body>, so visible_text may differ in
+    whitespace. Malformed markup (misnested tags, forms in tables) is repaired
+    differently by each parser.
+
+    Args:
+        html (str): The page source.
+        parser (str): 'html.parser' (BeautifulSoup, pure Python), 'lxml' (BeautifulSoup
+            on the lxml C parser) or 'selectolax' (lexbor C parser, no BeautifulSoup
+            tree at all). Defaults to the parser set with set_default_parser().
+
+    Returns:
+        PageStats: Counters for every page content feature.
+    """
+    parser = parser or _default_parser
+    stats = PageStats()
+    _parse_document(html, parser, stats)
+    stats.scan_source(html)
+    return stats
+
+
+_HTML_BUILDER = HTMLParserTreeBuilder(store_line_numbers=False)
+_EMPTY_ELEMENT = SimpleNamespace(is_empty_element=True)
+_ELEMENT = SimpleNamespace(is_empty_element=False)
+
+
+class _SoupEvents:
+    """
+    Stands in for the BeautifulSoup object that bs4's html.parser driver builds its
+    tree into, reporting every node to a PageStats as soon as BeautifulSoup would
+    have added it to the tree, so no tree is built.
+
+    The events match walk_soup() over the finished tree: text is merged until the
+    next tag or comment, whitespace-only text collapses to one space or newline
+    outside <pre> and <textarea>, empty-element tags close at once, an end tag
+    closes every element opened after its start tag and an end tag without a
+    matching open element is ignored.
+    """
+
+    builder = _HTML_BUILDER
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.contains_replacement_characters = False
+        self._open_tags = []
+        self._open_counts = Counter()  # open elements per tag name
+        self._open_preserving = 0  # open <pre> and <textarea> elements
+        self._data = []
+
+    def handle_starttag(self, name, namespace, nsprefix, attrs, sourceline=None, sourcepos=None,
+                        namespaces=None):
+        self.endData()
+        self._push(name)
+        self.stats.start_tag(name, attrs)
+        return _EMPTY_ELEMENT if self.builder.can_be_empty_element(name) else _ELEMENT
+
+    def handle_endtag(self, name, nsprefix=None):
+        self.endData()
+        if self._open_counts[name]:
+            while self._pop() != name:
+                pass
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def endData(self, containerClass=None):
+        if not self._data:
+            return
+        data = ''.join(self._data)
+        self._data = []
+        if not self._open_preserving and not data.strip(BeautifulSoup.ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+        self.stats.text(data, containerClass is Comment)
+
+    def close(self):
+        self.endData()
+        while self._open_tags:
+            self._pop()
+
+    def _push(self, name):
+        self._open_tags.append(name)
+        self._open_counts[name] += 1
+        if name in self.builder.preserve_whitespace_tags:
+            self._open_preserving += 1
+
+    def _pop(self):
+        name = self._open_tags.pop()
+        self._open_counts[name] -= 1
+        if name in self.builder.preserve_whitespace_tags:
+            self._open_preserving -= 1
+        self.stats.end_tag(name)
+        return name
+
+
+class _StreamingHTMLParser(BeautifulSoupHTMLParser):
+    """
+    BeautifulSoupHTMLParser that is fed a document in chunks but reports what one
+    feed() of the whole document would have.
+
+    html.parser stops at the '&#' of a character reference it cannot read when some
+    ';' follows it. Given the whole document, the first such '&#' ends feed(), and
+    close() passes everything after the second one on as text. Fed chunk by chunk
+    it would parse on, so the second one is tracked here.
+    """
+
+    def __init__(self, soup):
+        super().__init__(soup, convert_charrefs=False)
+        self._unread_charrefs = 0
+        self._rest_is_text = False
+
+    def handle_data(self, data):
+        # Outside <script> and <style>, html.parser only passes on a lone '&#'
+        # when it gives up on a character reference
+        if data == '&#' and not self.cdata_elem:
+            self._unread_charrefs += 1
+        super().handle_data(data)
+
+    def feed(self, data):
+        if self._rest_is_text:
+            self.soup.handle_data(data)
+            return
+        super().feed(data)
+        if self._unread_charrefs >= 2:
+            self._rest_is_text = True
+            if self.rawdata:
+                self.soup.handle_data(self.rawdata)
+            self.rawdata = ''
+
+
+def decode_body(body, encoding):
+    """
+    Decodes a response body the way requests' Response.text does: with the
+    encoding from the headers, else the one detected from the body, else UTF-8,
+    replacing undecodable bytes.
+    """
+    if not body:
+        return ''
+    if encoding is None:
+        encoding = chardet.detect(body)['encoding'] if chardet is not None else 'utf-8'
+    try:
+        return str(body, encoding, errors='replace')
+    except (LookupError, TypeError):
+        return str(body, errors='replace')
+
+
+class PageStream:
+    """
+    Parses a page while it downloads: start() it with the response once the headers
+    are in, feed() it the body chunk by chunk and close() returns the same PageStats
+    as parse_page() on the whole response.text.
+
+    With html.parser the document is decoded and parsed chunk by chunk, so the
+    counters grow as the data arrives and neither the page source nor a tree is
+    ever held in full. lxml and selectolax keep the decoded source and parse it in
+    close(), as does any backend when the response names no encoding and it has to
+    be detected from the whole body. The body of a non-200 response is ignored.
+
+    Args:
+        parser (str): Parser backend (see parse_page()).
+    """
+
+    def __init__(self, parser=None):
+        self.parser = parser or _default_parser
+        if self.parser not in PARSERS:
+            raise ValueError(f"Unknown parser {self.parser!r}; expected one of {PARSERS}")
+        self.stats = PageStats()
+        self.seconds = 0.0  # spent decoding and parsing
+        self._parse = False
+        self._encoding = None
+        self._decoder = None
+        self._body = []  # raw chunks, until the encoding can be detected
+        self._source = []  # decoded source, for backends that parse the whole document
+        self._html_parser = None
+        self._closed = False
+
+    def start(self, response):
+        self._parse = response.status_code == 200
+        self._encoding = response.encoding
+        if self._encoding is not None:
+            try:
+                self._decoder = codecs.getincrementaldecoder(self._encoding)(errors='replace')
+            except LookupError:
+                self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        if self.parser == 'html.parser':
+            self._html_parser = _StreamingHTMLParser(_SoupEvents(self.stats))
+
+    def feed(self, chunk):
+        if not self._parse:
+            return
+        start = time.perf_counter()
+        if self._decoder is None:
+            self._body.append(chunk)
+        else:
+            self._feed_source(self._decoder.decode(chunk))
+        self.seconds += time.perf_counter() - start
+
+    def _feed_source(self, text):
+        if not text:
+            return
+        self.stats.scan_source(text)
+        if self._html_parser is not None:
+            self._html_parser.feed(text)
+        else:
+            self._source.append(text)
+
+    def close(self):
+        """
+        Finishes the parse and returns the PageStats (None for a non-200 response).
+        Closing the stream again returns the same result.
+        """
+        if not self._parse:
+            return None
+        if self._closed:
+            return self.stats
+        self._closed = True
+        start = time.perf_counter()
+        if self._decoder is None:
+            self._feed_source(decode_body(b''.join(self._body), self._encoding))
+            self._body = []
+        else:
+            self._feed_source(self._decoder.decode(b'', final=True))
+        if self._html_parser is not None:
+            self._html_parser.close()
+            self._html_parser.soup.close()
+            self._html_parser = None
+        else:
+            source = ''.join(self._source)
+            self._source = []
+            _parse_document(source, self.parser, self.stats)
+        self.seconds += time.perf_counter() - start
+        return self.stats
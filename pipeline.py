@@ -0,0 +1,207 @@
+# pipeline.py
+import asyncio
+import csv
+import time
+from collections import Counter, deque
+from itertools import islice
+
+import feature_registry
+from async_feature_extraction import iter_many_async
+from batch_extraction import extract_many
+from feature_extraction import score_spelling
+from model import load_model, classify_features
+from url_screen import screen_urls
+
+FEATURE_COLUMNS = feature_registry.FEATURE_NAMES + ['url']
+
+DEFAULT_BATCH_SIZE = 256
+
+
+def micro_batches(items, size):
+    """
+    Yields lists of up to size items from any iterable, reading it lazily.
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_extract(urls, workers=8, per_host_limit=2, use_async=False, features=None, tree_model=None,
+                 deadline=None, defer_spelling=False):
+    """
+    Extracts features for a stream of URLs on one worker pool (or one event loop
+    with use_async), so host-scoped work and the per-host limits are shared by the
+    whole stream. A None item is yielded back as (None, None) without extraction.
+    With defer_spelling, spelling_mistakes_ratio is left for
+    feature_extraction.score_spelling().
+
+    Yields:
+        tuple: (url, features) in input order.
+    """
+    if use_async:
+        return _iter_async(iter_many_async(urls, concurrency=workers, per_host_limit=per_host_limit,
+                                           features=features, deadline=deadline,
+                                           defer_spelling=defer_spelling))
+    return extract_many(urls, workers=workers, per_host_limit=per_host_limit, features=features,
+                        tree_model=tree_model, deadline=deadline, defer_spelling=defer_spelling)
+
+
+def _iter_async(results):
+    """
+    Iterates an async generator from synchronous code on a private event loop,
+    which runs (and the probes progress) while the next result is awaited.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+
+def classify_stream(urls, batch_size=DEFAULT_BATCH_SIZE, screen=None, feature_mode="all", journal=None, since=None,
+                    indexed=False, **extract_options):
+    """
+    Streams URLs through screening, extraction and classification. One extraction
+    (see iter_extract) runs over the whole stream, and its results are classified
+    in micro-batches, so results appear as soon as their batch is done and only a
+    bounded window of URLs and feature dictionaries is held in memory.
+
+    Args:
+        urls (iterable): URLs to classify. Consumed lazily.
+        batch_size (int): Number of URLs per micro-batch.
+        screen (URLScreen): Optional lexical pre-screen (see url_screen).
+        feature_mode (str): "all", "model" or "tree" (see main.py --features).
+        journal (FeatureJournal): Journal of extracted features. URLs with a fresh
+            record are classified from it instead of being extracted again, and every
+            new extraction is appended and synced as soon as its micro-batch completes
+            (an incomplete one, see journal.is_complete, is extracted again next run).
+        since (float): With a journal, only yield extracted URLs whose features were
+            extracted at or after this time (epoch seconds), e.g. the new part of a
+            growing feed. URLs decided by the screen are always yielded.
+        indexed (bool): urls holds (index, url) pairs, e.g. rows of a shard with
+            their position in the whole feed.
+        **extract_options: workers, per_host_limit, use_async and deadline for iter_extract().
+
+    Yields:
+        tuple: (index, url, features, label, stage) in input order. index is the
+            URL's position in urls (or the index it came with), stage is "screen"
+            for URLs decided by the screen (features is None) and "model" otherwise.
+    """
+    model = load_model()
+    features = feature_registry.model_feature_names(model) if feature_mode == "model" else None
+    tree_model = model if feature_mode == "tree" else None
+
+    # (index, url, screen label) of every URL handed to the extraction, which yields
+    # one result per URL in the same order
+    rows = deque()
+    # URLs being extracted for the journal, so a repeated URL is extracted once
+    queued = set()
+
+    def extraction_input():
+        items = urls if indexed else enumerate(urls)
+        for indexed_batch in micro_batches(items, batch_size):
+            batch = [url for _, url in indexed_batch]
+            labels = screen_urls(batch, screen)[0] if screen is not None else [None] * len(batch)
+            for (index, url), label in zip(indexed_batch, labels):
+                rows.append((index, url, label))
+                if label is not None:
+                    yield None
+                elif journal is not None and (url in queued or journal.is_fresh(url, time.time())):
+                    yield None
+                else:
+                    if journal is not None:
+                        queued.add(url)
+                    yield url
+
+    def spelled(results):
+        # The pages' spelling is scored against the dictionary once per micro-batch
+        for batch in micro_batches(results, batch_size):
+            score_spelling([url_features for url, url_features in batch if url is not None])
+            yield from batch
+
+    def journaled(results):
+        for url, url_features in results:
+            if journal is not None and url is not None:
+                journal.append(url, url_features)
+                journal.sync()
+                queued.discard(url)
+            yield url, url_features
+
+    # The tree's decision path needs each URL's spelling ratio as it is walked
+    results = journaled(spelled(iter_extract(extraction_input(), features=features, tree_model=tree_model,
+                                             defer_spelling=tree_model is None, **extract_options)))
+    for batch in micro_batches(results, batch_size):
+        batch_rows = [rows.popleft() for _ in batch]
+        extracted = []
+        for (index, url, label), (_, url_features) in zip(batch_rows, batch):
+            if label is None:
+                extracted.append(journal.get(url) if journal is not None else url_features)
+        predicted = zip(extracted, classify_features(extracted, model))
+        for index, url, label in batch_rows:
+            if label is None:
+                url_features, label = next(predicted)
+                if since is not None and journal.extracted_at(url) < since:
+                    continue
+                yield index, url, url_features, label, "model"
+            else:
+                yield index, url, None, label, "screen"
+
+
+def run_pipeline(urls, features_csv="extracted_features.csv", results_csv="classified_results.csv",
+                 batch_size=DEFAULT_BATCH_SIZE, screen=None, index_column=False, **options):
+    """
+    Classifies URLs with classify_stream() and writes both CSVs incrementally.
+
+    extracted_features.csv always has the FEATURE_COLUMNS columns; a feature that
+    was not extracted for a URL is left empty. With a deadline it also has a
+    missing_features column listing (";"-separated) the features that fell back to
+    their default. classified_results.csv gets a stage column when a screen is
+    used. With index_column, both files start with an "index" column holding each
+    URL's index from classify_stream().
+
+    Returns:
+        Counter: Number of URLs per label and per stage, and under "partial" the
+            number classified from a partial feature vector.
+    """
+    counts = Counter()
+    result_columns = ['url', 'predicted_label'] + (['stage'] if screen is not None else [])
+    feature_columns = FEATURE_COLUMNS
+    if options.get('deadline') is not None:
+        feature_columns = feature_columns + [feature_registry.MISSING_FEATURES]
+    if index_column:
+        result_columns = ['index'] + result_columns
+        feature_columns = ['index'] + feature_columns
+    # Line buffering: every row reaches the file as soon as it is classified.
+    with open(features_csv, "w", newline="", buffering=1) as features_file, \
+            open(results_csv, "w", newline="", buffering=1) as results_file:
+        features_writer = csv.DictWriter(features_file, feature_columns, extrasaction='ignore')
+        features_writer.writeheader()
+        results_writer = csv.writer(results_file)
+        results_writer.writerow(result_columns)
+
+        stream = classify_stream(urls, batch_size=batch_size, screen=screen, **options)
+        for count, (index, url, url_features, label, stage) in enumerate(stream, 1):
+            row = [index, url, label, stage] if index_column else [url, label, stage]
+            if url_features is not None:
+                row_features = dict(url_features, url=url, index=index)
+                if feature_registry.MISSING_FEATURES in row_features:
+                    row_features[feature_registry.MISSING_FEATURES] = \
+                        ";".join(row_features[feature_registry.MISSING_FEATURES])
+                    counts['partial'] += 1
+                features_writer.writerow(row_features)
+            results_writer.writerow(row[:len(result_columns)])
+            counts[label] += 1
+            counts[stage] += 1
+            if count % batch_size == 0:
+                print(f"[INFO] Classified {count} URLs so far ({dict(counts)}).")
+    return counts
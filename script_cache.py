@@ -0,0 +1,161 @@
+# script_cache.py
+import asyncio
+import contextvars
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import deadline
+
+# Upper bounds for the process-wide caches.
+MAX_CACHED_SCRIPT_BYTES = 64 * 1024 * 1024
+MAX_CACHED_ANALYSES = 100000
+FETCH_WORKERS = 16
+
+_lock = threading.Lock()
+_scripts = OrderedDict()  # absolute script URL -> script text, least recently used first
+_script_bytes = 0
+_in_flight = {}  # absolute script URL -> Future of a download in progress
+_analyses = OrderedDict()  # content hash -> analysis result, least recently used first
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='script-fetch')
+_hits = 0
+_misses = 0
+
+
+def content_hash(data):
+    """
+    Returns the digest used to identify script content (data is the UTF-8 encoded script).
+    """
+    return hashlib.sha1(data).digest()
+
+
+def submit(fetch, js_url):
+    """
+    Runs fetch(js_url) on the shared script download pool and returns its Future.
+    The caller's context goes along, so the download is instrumented as part of
+    the caller's URL.
+    """
+    return _executor.submit(contextvars.copy_context().run, fetch, js_url)
+
+
+def get_script(js_url, download):
+    """
+    Returns the text of an external script, calling download(js_url) only when it
+    is not cached. Concurrent requests for the same URL share one download, and
+    failed downloads are not cached.
+    """
+    global _hits, _misses
+    with _lock:
+        if js_url in _scripts:
+            _scripts.move_to_end(js_url)
+            _hits += 1
+            return _scripts[js_url]
+        future = _in_flight.get(js_url)
+        owner = future is None
+        if owner:
+            _misses += 1
+            future = _in_flight[js_url] = Future()
+    if not owner:
+        try:
+            return deadline.result(future)
+        except deadline.DeadlineExceeded:
+            deadline.check()
+            # The shared download was cut short by another URL's deadline
+            return get_script(js_url, download)
+
+    try:
+        text = download(js_url)
+    except Exception as e:
+        with _lock:
+            del _in_flight[js_url]
+        future.set_exception(e)
+        raise
+    store_script(js_url, text)
+    future.set_result(text)
+    return text
+
+
+async def get_script_async(js_url, download):
+    """
+    Async counterpart of get_script(): awaits download(js_url) only when the script
+    is not cached, sharing in-flight downloads with get_script() and other tasks.
+    """
+    global _hits, _misses
+    with _lock:
+        if js_url in _scripts:
+            _scripts.move_to_end(js_url)
+            _hits += 1
+            return _scripts[js_url]
+        future = _in_flight.get(js_url)
+        owner = future is None
+        if owner:
+            _misses += 1
+            future = _in_flight[js_url] = Future()
+    if not owner:
+        try:
+            # Shielded: cancelling this task must not cancel the shared download
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except deadline.DeadlineExceeded:
+            deadline.check()
+            return await get_script_async(js_url, download)
+
+    try:
+        text = await download(js_url)
+    except BaseException as e:
+        with _lock:
+            del _in_flight[js_url]
+        # A download cancelled at this URL's deadline is retried by the waiting URLs
+        future.set_exception(e if isinstance(e, Exception) else deadline.DeadlineExceeded())
+        raise
+    store_script(js_url, text)
+    future.set_result(text)
+    return text
+
+
+def store_script(js_url, text):
+    global _script_bytes
+    size = len(text)
+    with _lock:
+        _in_flight.pop(js_url, None)
+        previous = _scripts.pop(js_url, None)
+        if previous is not None:
+            _script_bytes -= len(previous)
+        if size > MAX_CACHED_SCRIPT_BYTES:
+            return
+        _scripts[js_url] = text
+        _script_bytes += size
+        while _script_bytes > MAX_CACHED_SCRIPT_BYTES:
+            _, evicted = _scripts.popitem(last=False)
+            _script_bytes -= len(evicted)
+
+
+def get_analysis(digest, analyze):
+    """
+    Returns the cached analysis of the script content identified by digest,
+    computing it with analyze() on a miss, so identical scripts are scored once.
+    """
+    with _lock:
+        if digest in _analyses:
+            _analyses.move_to_end(digest)
+            return _analyses[digest]
+    result = analyze()
+    with _lock:
+        _analyses[digest] = result
+        if len(_analyses) > MAX_CACHED_ANALYSES:
+            _analyses.popitem(last=False)
+    return result
+
+
+def stats():
+    with _lock:
+        return {'hits': _hits, 'misses': _misses, 'cached_scripts': len(_scripts),
+                'cached_bytes': _script_bytes, 'cached_analyses': len(_analyses)}
+
+
+def clear():
+    global _script_bytes
+    with _lock:
+        _scripts.clear()
+        _analyses.clear()
+        _script_bytes = 0
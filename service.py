@@ -0,0 +1,275 @@
+# service.py
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import domain_cache
+import feature_registry
+import http_client
+import page_stats
+import script_cache
+from batch_extraction import HostLimiter, extract_one, extract_many
+from feature_extraction import get_spell_checker, score_spelling
+from model import load_model, classify_features
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT = 0.005  # seconds a request waits for others to share its predict call
+MAX_URLS_PER_REQUEST = 1000
+
+
+class Batcher:
+    """
+    Coalesces concurrent single-URL classifications into batched predict calls.
+
+    A background thread takes the first waiting request, gathers whatever else
+    arrives within max_wait seconds (up to max_batch rows) and classifies them with
+    one classify_features() call.
+    """
+
+    def __init__(self, model, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='classify-batcher', daemon=True)
+        self._thread.start()
+
+    def classify(self, features):
+        """
+        Queues one feature dictionary and returns a Future of its label.
+        """
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(items) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    items.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                labels = classify_features([features for features, _ in items], self.model)
+            except Exception as e:
+                print(f"[ERROR] Batched classification failed: {e}")
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(items)
+            for (_, future), label in zip(items, labels):
+                future.set_result(label)
+
+
+class ClassificationService:
+    """
+    Keeps everything a classification needs warm across requests: the model, the
+    SpellChecker dictionary, the pooled HTTP session and the domain and script caches.
+
+    Args:
+        feature_mode (str): "all" or "model" (extract only the model's features).
+        workers (int): Worker threads for multi-URL requests.
+        per_host_limit (int): Maximum concurrent extractions against one host.
+        max_batch (int): Most rows in one coalesced predict call.
+        max_wait (float): Seconds a request waits for others to share its predict call.
+        deadline (float): Seconds each URL's extraction may take; features still
+            waiting on the network then fall back to their defaults.
+    """
+
+    def __init__(self, feature_mode="all", workers=8, per_host_limit=2, max_batch=DEFAULT_MAX_BATCH,
+                 max_wait=DEFAULT_MAX_WAIT, deadline=None):
+        print("[INFO] Warming up model, spell checker and HTTP pool...")
+        self.model = load_model()
+        get_spell_checker()
+        http_client.get_session()
+        self.features = feature_registry.model_feature_names(self.model) if feature_mode == "model" else None
+        self.workers = workers
+        self.per_host_limit = per_host_limit
+        self.deadline = deadline
+        self.limiter = HostLimiter(per_host_limit)
+        self.batcher = Batcher(self.model, max_batch, max_wait)
+        self.started = time.time()
+        self.requests = 0
+        self._requests_lock = threading.Lock()
+
+    def count_request(self):
+        # Handler threads serve requests concurrently
+        with self._requests_lock:
+            self.requests += 1
+
+    def classify_url(self, url):
+        """
+        Extracts features for one URL and classifies it in the next coalesced batch.
+
+        Returns:
+            dict: url, predicted_label and the extracted features (with the list of
+                features that fell back to their default under "missing_features").
+        """
+        self.count_request()
+        features = extract_one(url, self.limiter, features=self.features, deadline=self.deadline)
+        return {'url': url, 'predicted_label': self.batcher.classify(features).result(), 'features': features}
+
+    def classify_urls(self, urls):
+        """
+        Extracts features for several URLs concurrently and classifies them in one batch.
+        """
+        self.count_request()
+        results = list(extract_many(urls, workers=self.workers, per_host_limit=self.per_host_limit,
+                                    features=self.features, deadline=self.deadline, defer_spelling=True))
+        score_spelling([features for _, features in results])
+        labels = classify_features([features for _, features in results], self.model)
+        return [{'url': url, 'predicted_label': label, 'features': features}
+                for (url, features), label in zip(results, labels)]
+
+    def stats(self):
+        return {
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'predict_batches': self.batcher.batches,
+            'predict_rows': self.batcher.rows,
+            'domain_cache': domain_cache.get_cache().stats(),
+            'script_cache': script_cache.stats(),
+        }
+
+
+class ClassificationHandler(BaseHTTPRequestHandler):
+    """
+    JSON API:
+        GET  /classify?url=<url>        classify one URL
+        POST /classify {"url": ...}     classify one URL
+        POST /classify {"urls": [...]}  classify several URLs
+        GET  /health, GET /stats
+    """
+
+    server_version = "URLClassifier/1.0"
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        elif parsed.path == '/stats':
+            self.send_json(200, self.server.service.stats())
+        elif parsed.path == '/classify':
+            urls = parse_qs(parsed.query).get('url')
+            if not urls:
+                self.send_json(400, {'error': "missing 'url' query parameter"})
+                return
+            self.classify({'url': urls[0]})
+        else:
+            self.send_json(404, {'error': f"unknown path {parsed.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/classify':
+            self.send_json(404, {'error': f"unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            self.send_json(400, {'error': f"invalid JSON body: {e}"})
+            return
+        if not isinstance(body, dict):
+            self.send_json(400, {'error': "expected a JSON object"})
+            return
+        self.classify(body)
+
+    def classify(self, body):
+        service = self.server.service
+        start = time.perf_counter()
+        try:
+            if isinstance(body.get('urls'), list):
+                if not all(isinstance(url, str) for url in body['urls']):
+                    self.send_json(400, {'error': "'urls' must be a list of strings"})
+                    return
+                if len(body['urls']) > MAX_URLS_PER_REQUEST:
+                    self.send_json(400, {'error': f"at most {MAX_URLS_PER_REQUEST} URLs per request"})
+                    return
+                result = {'results': service.classify_urls(body['urls'])}
+            elif isinstance(body.get('url'), str):
+                result = service.classify_url(body['url'])
+            else:
+                self.send_json(400, {'error': "expected a 'url' string or a 'urls' list"})
+                return
+        except Exception as e:
+            print(f"[ERROR] Classification request failed: {e}")
+            self.send_json(500, {'error': str(e)})
+            return
+        result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        self.send_json(200, result)
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(service, host='127.0.0.1', port=8080):
+    """
+    Creates the HTTP server for a ClassificationService (one thread per connection).
+    """
+    server = ThreadingHTTPServer((host, port), ClassificationHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve URL spam/ham classification over a local HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=8, help="extraction workers for multi-URL requests")
+    parser.add_argument("--per-host-limit", type=int, default=2,
+                        help="maximum concurrent extractions against a single host")
+    parser.add_argument("--features", dest="feature_mode", choices=("all", "model"), default="all",
+                        help="extract every feature or only the model's features")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH,
+                        help="most single-URL requests coalesced into one predict call")
+    parser.add_argument("--max-wait", type=float, default=DEFAULT_MAX_WAIT,
+                        help="seconds a request waits for others to share its predict call")
+    parser.add_argument("--deadline", type=float,
+                        help="seconds each URL's extraction may take before its remaining features fall back "
+                             "to their defaults")
+    parser.add_argument("--cache-path", default="domain_cache.sqlite",
+                        help="SQLite file caching WHOIS, DNS and certificate lookups across runs ('' to disable)")
+    parser.add_argument("--connect-timeout", type=float, default=5, help="HTTP connect timeout in seconds")
+    parser.add_argument("--read-timeout", type=float, default=10, help="HTTP read timeout in seconds")
+    parser.add_argument("--total-timeout", type=float, default=30,
+                        help="seconds a whole HTTP fetch (redirects and body included) may take")
+    parser.add_argument("--max-body-mb", type=float, default=10,
+                        help="MB of a page or script body that is read; the rest is ignored")
+    parser.add_argument("--parser", choices=page_stats.PARSERS, default="html.parser", help="HTML parser backend")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    domain_cache.configure(path=args.cache_path or None)
+    page_stats.set_default_parser(args.parser)
+    http_client.configure(connect_timeout=args.connect_timeout, read_timeout=args.read_timeout,
+                          total_timeout=args.total_timeout,
+                          max_body_bytes=int(args.max_body_mb * 1024 * 1024))
+    service = ClassificationService(args.feature_mode, args.workers, args.per_host_limit, args.max_batch,
+                                    args.max_wait, args.deadline)
+    server = make_server(service, args.host, args.port)
+    print(f"[INFO] Serving URL classification on http://{args.host}:{args.port}/classify")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down.")
+    finally:
+        server.server_close()
+        domain_cache.get_cache().close()
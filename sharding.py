@@ -0,0 +1,150 @@
+# sharding.py
+import csv
+import heapq
+import multiprocessing
+import os
+
+import domain_cache
+import http_client
+from feature_extraction import get_spell_checker
+from journal import FeatureJournal
+from model import load_model
+from pipeline import run_pipeline
+from web_crawler import iter_urls
+
+
+def shard_paths(shard_dir, shard_index, shards):
+    """
+    Returns the (features, results) CSV paths of one shard's output.
+    """
+    stem = os.path.join(shard_dir, f"shard-{shard_index:04d}-of-{shards:04d}")
+    return f"{stem}.features.csv", f"{stem}.results.csv"
+
+
+def run_shard(csv_file, shard_index, shards, shard_dir, input_options=None, journal_path=None, max_age=None,
+              shard_by="domain", **pipeline_options):
+    """
+    Classifies one shard of the feed and writes its per-shard CSVs to shard_dir.
+
+    By default URLs are assigned to shards by a stable hash of their registered
+    domain (see web_crawler.shard_of), so every process or machine agrees on the
+    assignment and each domain's WHOIS, DNS, certificate and robots.txt lookups stay
+    in one shard. Every row carries its index in the whole feed, which
+    merge_shards() sorts on.
+
+    Args:
+        csv_file (str): The whole feed; every shard reads it and keeps its own rows.
+        shard_index (int): Shard to run (0-based).
+        shards (int): Total number of shards.
+        shard_dir (str): Directory for the per-shard CSVs.
+        input_options (dict): Further iter_urls() options (dedupe, normalize, ...).
+        journal_path (str): Journal prefix; each shard keeps its own journal file.
+        max_age (float): Journal record expiry in seconds.
+        shard_by (str): "domain" or "line" (row index modulo shards), see
+            web_crawler.iter_urls(). Every shard of a run must use the same.
+        **pipeline_options: Passed on to run_pipeline().
+
+    Returns:
+        Counter: Number of URLs per label and per stage.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    input_options = dict(input_options or {}, shards=shards, shard_index=shard_index, shard_by=shard_by)
+    urls = iter_urls(csv_file, with_index=True, **input_options)
+    features_csv, results_csv = shard_paths(shard_dir, shard_index, shards)
+    journal = None
+    if journal_path:
+        journal = FeatureJournal(f"{journal_path}.shard-{shard_index:04d}-of-{shards:04d}", max_age=max_age)
+    try:
+        return run_pipeline(urls, features_csv, results_csv, indexed=True, index_column=True, journal=journal,
+                            **pipeline_options)
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+def _merge_csv(paths, output_path):
+    readers = []
+    files = [open(path, newline="") for path in paths]
+    try:
+        header = None
+        for path, file in zip(paths, files):
+            reader = csv.reader(file)
+            shard_header = next(reader, None)
+            if header is None:
+                header = shard_header
+            elif shard_header != header:
+                raise ValueError(f"{path} has columns {shard_header}, expected {header}")
+            readers.append(reader)
+        with open(output_path, "w", newline="") as output:
+            writer = csv.writer(output)
+            writer.writerow(header[1:])  # drop the index column
+            rows = 0
+            for row in heapq.merge(*readers, key=lambda row: int(row[0])):
+                writer.writerow(row[1:])
+                rows += 1
+        return rows
+    finally:
+        for file in files:
+            file.close()
+
+
+def merge_shards(shards, shard_dir, features_csv="extracted_features.csv",
+                 results_csv="classified_results.csv"):
+    """
+    Merges the per-shard CSVs of all shards into single files in feed order.
+
+    Each shard file is already sorted by feed index, so the merge streams through
+    them with heapq.merge; the result does not depend on which shard finished first
+    or where it ran.
+
+    Returns:
+        int: Number of merged result rows.
+    """
+    paths = [shard_paths(shard_dir, shard_index, shards) for shard_index in range(shards)]
+    missing = [path for pair in paths for path in pair if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"Missing shard output: {', '.join(missing)}")
+    _merge_csv([features for features, _ in paths], features_csv)
+    return _merge_csv([results for _, results in paths], results_csv)
+
+
+def _run_local_shard(args):
+    shard_index, shards, csv_file, shard_dir, cache_settings, shard_options = args
+    # SQLite connections must not be shared with the parent process
+    domain_cache.configure_after_fork(**cache_settings)
+    http_client.configure()
+    try:
+        return shard_index, run_shard(csv_file, shard_index, shards, shard_dir, **shard_options)
+    finally:
+        domain_cache.get_cache().close()
+
+
+def run_local_shards(csv_file, shards, shard_dir, processes=None, **shard_options):
+    """
+    Runs every shard in its own local process, then merges them with merge_shards().
+
+    The model and the SpellChecker dictionary are loaded before the workers are
+    forked, so the workers share them copy-on-write instead of loading their own.
+
+    Args:
+        csv_file (str): The whole feed.
+        shards (int): Number of shards.
+        shard_dir (str): Directory for the per-shard CSVs.
+        processes (int): Worker processes (one per shard by default).
+        **shard_options: Passed on to run_shard().
+
+    Returns:
+        dict: Counts per shard index.
+    """
+    load_model()
+    get_spell_checker()
+    cache = domain_cache.get_cache()
+    cache_settings = {'path': cache.path, 'ttls': cache.ttls, 'offline': cache.offline}
+    tasks = [(shard_index, shards, csv_file, shard_dir, cache_settings, shard_options)
+             for shard_index in range(shards)]
+    context = multiprocessing.get_context("fork")
+    with context.Pool(processes or shards) as pool:
+        counts = dict(pool.imap_unordered(_run_local_shard, tasks))
+    for shard_index in sorted(counts):
+        print(f"[INFO] Shard {shard_index}: {dict(counts[shard_index])}")
+    return counts
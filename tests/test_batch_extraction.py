@@ -0,0 +1,55 @@
+# tests/test_batch_extraction.py
+import threading
+import time
+
+from batch_extraction import HostGroups, HostLimiter, host_key
+
+
+def test_urls_on_one_host_share_host_features():
+    groups = HostGroups()
+    first = groups.host_features('https://www.example.com/a')
+    assert groups.host_features('https://www.example.com/b?x=1') is first
+    assert groups.host_features('http://www.example.com/a') is not first
+    assert host_key('https://www.example.com:8443/a') == ('example.com', 'https', 'www.example.com:8443')
+
+
+def test_host_groups_drop_the_least_recently_used():
+    groups = HostGroups(max_groups=2)
+    a = groups.host_features('https://a.example.com/')
+    groups.host_features('https://b.example.com/')
+    groups.host_features('https://a.example.com/')
+    groups.host_features('https://c.example.com/')
+    assert len(groups) == 2
+    assert groups.host_features('https://a.example.com/') is a
+
+
+def test_host_limiter_caps_concurrency_per_host():
+    limiter = HostLimiter(2)
+    lock = threading.Lock()
+    running = {'a': 0, 'b': 0}
+    peak = {'a': 0, 'b': 0}
+
+    def extract(host):
+        with limiter.hold(f'https://{host}.example.com/'):
+            with lock:
+                running[host] += 1
+                peak[host] = max(peak[host], running[host])
+            time.sleep(0.02)
+            with lock:
+                running[host] -= 1
+
+    threads = [threading.Thread(target=extract, args=(host,)) for host in 'ab' * 6]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert peak == {'a': 2, 'b': 2}
+
+
+def test_host_limiter_forgets_idle_hosts():
+    limiter = HostLimiter(1)
+    with limiter.hold('https://a.example.com/'):
+        with limiter.hold('https://b.example.com/'):
+            assert len(limiter) == 2
+        assert len(limiter) == 1
+    assert len(limiter) == 0
@@ -0,0 +1,100 @@
+# tests/test_compiled_tree.py
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from model import CompiledTree, classify_lazily
+
+# Extracted features, plus one the extractor does not know (it always counts as 0)
+FEATURES = ['url_len', 'has_robots', 'no_of_iframe', 'content_richness', 'legacy_score']
+
+
+@pytest.fixture(scope='module')
+def model():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame({
+        'url_len': rng.integers(10, 200, 400).astype(float),
+        'has_robots': rng.integers(0, 2, 400).astype(float),
+        'no_of_iframe': rng.integers(0, 5, 400).astype(float),
+        'content_richness': rng.random(400),
+        'legacy_score': rng.random(400),
+    })
+    y = ((X['url_len'] > 80) & (X['has_robots'] == 0) | (X['no_of_iframe'] > 2)).astype(int)
+    # Missing values in training give the splits a missing value direction
+    X.loc[rng.random(400) < 0.1, 'has_robots'] = np.nan
+    X.loc[rng.random(400) < 0.1, 'no_of_iframe'] = np.nan
+    return DecisionTreeClassifier(max_depth=6, random_state=0).fit(X, y)
+
+
+def random_rows(count, seed=2):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        row = {'url_len': rng.randrange(10, 200), 'has_robots': rng.randrange(2),
+               'no_of_iframe': rng.randrange(5), 'content_richness': rng.random()}
+        for name in list(row):
+            if rng.random() < 0.2:
+                del row[name]
+        rows.append(row)
+    return rows
+
+
+def sklearn_labels(model, tree, rows, fill_missing=None):
+    X = pd.DataFrame([tree.row_values(row, fill_missing) for row in rows], columns=FEATURES)
+    return ["ham" if label == 0 else "spam" for label in model.predict(X)]
+
+
+class StubExtractor:
+    """
+    Stands in for URLFeatureExtractor: returns the row's value of a feature (None when
+    it is absent) and raises for the features in failing.
+    """
+
+    url = 'https://www.example.com/'
+
+    def __init__(self, row, failing=()):
+        self.row = row
+        self.failing = set(failing)
+        self.computed = []
+
+    def compute_feature(self, name):
+        self.computed.append(name)
+        if name in self.failing:
+            raise ValueError(f"{name} failed")
+        return self.row.get(name)
+
+
+def test_predict_rows_matches_sklearn(model):
+    tree = CompiledTree(model)
+    assert tree.missing_left.any() and not tree.missing_left.all()
+    rows = random_rows(500)
+    assert tree.predict_rows(rows) == sklearn_labels(model, tree, rows)
+    assert tree.predict_rows(rows, fill_missing=0) == sklearn_labels(model, tree, rows, fill_missing=0)
+
+
+def test_predict_matrix_matches_predict_rows(model):
+    tree = CompiledTree(model)
+    rows = random_rows(500)
+    matrix = np.array([tree.row_values(row) for row in rows])
+    assert tree.predict_matrix(matrix).tolist() == tree.predict_rows(rows)
+
+
+def test_unknown_model_features_count_as_zero(model):
+    tree = CompiledTree(model)
+    values = tree.row_values({'url_len': 50, 'legacy_score': 0.9})
+    assert values[FEATURES.index('legacy_score')] == 0
+    assert np.isnan(values[FEATURES.index('has_robots')])
+
+
+def test_classify_lazily_matches_predict_rows(model):
+    tree = CompiledTree(model)
+    for index, row in enumerate(random_rows(300)):
+        failing = [name for name in row if index % 3 == 0 and name != 'url_len']
+        extractor = StubExtractor(row, failing)
+        expected = tree.predict_rows([{name: value for name, value in row.items() if name not in failing}])[0]
+        assert classify_lazily(extractor, model) == expected
+        # Features the extractor does not know are never asked for
+        assert 'legacy_score' not in extractor.computed
@@ -0,0 +1,117 @@
+# tests/test_deadline.py
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+import deadline
+import feature_registry
+import http_client
+from feature_extraction import URLFeatureExtractor
+
+
+def drip_server(header, interval=0.1, count=100):
+    """
+    Starts a server that sends the header, then one body byte every interval
+    seconds, and returns its port.
+    """
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(4)
+
+    def handle(connection):
+        try:
+            connection.recv(65536)
+            connection.sendall(header)
+            for _ in range(count):
+                connection.sendall(b'x')
+                time.sleep(interval)
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+    def accept():
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(connection,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def no_proxy(monkeypatch):
+    for name in ('HTTP_PROXY', 'http_proxy', 'ALL_PROXY', 'all_proxy'):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_no_budget_means_no_deadline():
+    with deadline.budget(None):
+        assert deadline.current() is None
+        assert deadline.remaining() is None
+        assert not deadline.expired()
+        assert deadline.timeout(5) == 5
+        deadline.check()
+
+
+def test_timeouts_are_clipped_to_the_budget():
+    with deadline.budget(2):
+        assert deadline.timeout(30) <= 2
+        assert deadline.timeout(None) <= 2
+        assert deadline.timeout(0.5) == 0.5
+    assert deadline.current() is None
+
+
+def test_expired_budget_raises():
+    with deadline.budget(10) as budget:
+        budget.expire()
+        assert deadline.expired()
+        with pytest.raises(deadline.DeadlineExceeded):
+            deadline.check()
+        with pytest.raises(deadline.DeadlineExceeded):
+            deadline.timeout(5)
+
+
+def test_network_features_fall_back_once_the_deadline_has_passed():
+    extractor = URLFeatureExtractor('https://www.example.com/login')
+    with deadline.budget(0):
+        features = extractor.extract_url_features(['url_len', 'has_robots', 'dns_TTL'])
+    assert features['url_len'] == len('https://www.example.com/login')
+    assert features['has_robots'] == 0 and features['dns_TTL'] == 0
+    assert sorted(features[feature_registry.MISSING_FEATURES]) == ['dns_TTL', 'has_robots']
+
+
+@pytest.mark.parametrize('header', [
+    b"HTTP/1.1 200 OK\r\nContent-Length: 100000\r\n\r\n",
+    b"HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n",
+])
+def test_fetch_stops_a_slow_body_at_the_deadline(header, no_proxy):
+    server = drip_server(header)
+    try:
+        start = time.monotonic()
+        with deadline.budget(0.5):
+            with pytest.raises(deadline.DeadlineExceeded):
+                http_client.fetch(f"http://127.0.0.1:{server.getsockname()[1]}/")
+        assert time.monotonic() - start < 2
+    finally:
+        server.close()
+
+
+def test_total_timeout_stops_a_slow_body(no_proxy):
+    server = drip_server(b"HTTP/1.1 200 OK\r\nContent-Length: 100000\r\n\r\n")
+    settings = http_client.get_settings()
+    http_client.configure(**dict(settings, total_timeout=0.5))
+    try:
+        start = time.monotonic()
+        with pytest.raises(requests.exceptions.Timeout):
+            http_client.fetch(f"http://127.0.0.1:{server.getsockname()[1]}/")
+        assert time.monotonic() - start < 2
+    finally:
+        http_client.configure(**settings)
+        server.close()
@@ -0,0 +1,114 @@
+# tests/test_domain_cache.py
+import threading
+import time
+
+import pytest
+
+import deadline
+import domain_cache
+from domain_cache import DomainCache
+
+
+def test_lookup_runs_once_per_signal():
+    cache = DomainCache()
+    calls = []
+    for _ in range(3):
+        assert cache.lookup('dns', 'example.com', lambda: calls.append(1) or (300, 2)) == (300, 2)
+    assert len(calls) == 1
+    assert cache.stats()['dns'] == {'hits': 2, 'misses': 1}
+    assert cache.peek('dns', 'example.com') == (True, (300, 2))
+    assert cache.stats()['dns'] == {'hits': 2, 'misses': 1}
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    cache = DomainCache(ttls={'dns': 60})
+    now = time.time()
+    monkeypatch.setattr(domain_cache.time, 'time', lambda: now)
+    cache.put('dns', 'example.com', (300, 2))
+    now += 59
+    assert cache.get('dns', 'example.com') == (True, (300, 2))
+    now += 1
+    assert cache.get('dns', 'example.com') == (False, None)
+
+
+def test_failed_lookups_are_kept_briefly_and_in_memory_only(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = DomainCache(path=path)
+    now = time.time()
+    monkeypatch.setattr(domain_cache.time, 'time', lambda: now)
+    cache.put('whois', 'example.com', None)
+    assert cache.get('whois', 'example.com') == (True, None)
+    now += domain_cache.NEGATIVE_TTL
+    assert cache.get('whois', 'example.com') == (False, None)
+    cache.close()
+    assert DomainCache(path=path).get('whois', 'example.com') == (False, None)
+
+
+def test_signals_persist_across_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = DomainCache(path=path)
+    cache.put('dns', 'example.com', (300, 2))
+    cache.close()
+    cache = DomainCache(path=path, offline=True)
+    assert cache.lookup('dns', 'example.com', lambda: pytest.fail("looked up offline")) == (300, 2)
+    assert cache.lookup('dns', 'example.org', lambda: pytest.fail("looked up offline")) is None
+    cache.close()
+
+
+def test_memory_keeps_the_most_recently_used_entries():
+    cache = DomainCache(max_entries=2)
+    cache.put('dns', 'a.com', (1, 1))
+    cache.put('dns', 'b.com', (1, 1))
+    cache.get('dns', 'a.com')
+    cache.put('dns', 'c.com', (1, 1))
+    assert cache.peek('dns', 'a.com')[0] and cache.peek('dns', 'c.com')[0]
+    assert not cache.peek('dns', 'b.com')[0]
+
+
+def test_concurrent_lookups_share_one_fetch_and_drop_their_lock():
+    cache = DomainCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.lookup('dns', 'example.com', fetch)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [42] * 4 and len(calls) == 1
+    assert not cache._key_locks
+
+
+def test_waiting_for_another_lookup_is_bounded_by_the_deadline():
+    cache = DomainCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_fetch():
+        started.set()
+        release.wait(5)
+        return 42
+
+    holder = threading.Thread(target=cache.lookup, args=('dns', 'example.com', slow_fetch))
+    holder.start()
+    started.wait(5)
+    try:
+        start = time.monotonic()
+        with deadline.budget(0.2), pytest.raises(deadline.DeadlineExceeded):
+            cache.lookup('dns', 'example.com', lambda: 0)
+        assert time.monotonic() - start < 1
+    finally:
+        release.set()
+        holder.join(5)
+    assert not cache._key_locks
@@ -0,0 +1,82 @@
+# tests/test_journal.py
+import pytest
+
+import feature_registry
+from journal import FeatureJournal, is_complete
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'features.jsonl')
+
+
+def test_records_survive_reopening(path):
+    journal = FeatureJournal(path)
+    journal.append('http://a.example/', {'url_len': 18}, extracted_at=100.0)
+    journal.append('http://b.example/', {'url_len': 18, 'has_robots': 1}, extracted_at=200.0)
+    journal.close()
+
+    journal = FeatureJournal(path)
+    assert len(journal) == 2
+    assert journal.get('http://b.example/') == {'url_len': 18, 'has_robots': 1}
+    assert journal.extracted_at('http://a.example/') == 100.0
+    assert journal.is_fresh('http://a.example/')
+    assert not journal.is_fresh('http://c.example/') and journal.get('http://c.example/') is None
+    journal.close()
+
+
+def test_latest_record_wins(path):
+    journal = FeatureJournal(path)
+    journal.append('http://a.example/', {'url_len': 1}, extracted_at=100.0)
+    journal.append('http://a.example/', {'url_len': 2}, extracted_at=200.0)
+    journal.close()
+
+    journal = FeatureJournal(path)
+    assert len(journal) == 1
+    assert journal.get('http://a.example/') == {'url_len': 2}
+    assert journal.extracted_at('http://a.example/') == 200.0
+    journal.close()
+
+
+def test_records_expire_after_max_age(path):
+    journal = FeatureJournal(path, max_age=60)
+    journal.append('http://a.example/', {'url_len': 18}, extracted_at=1000.0)
+    assert journal.is_fresh('http://a.example/', now=1059.0)
+    assert not journal.is_fresh('http://a.example/', now=1060.0)
+    journal.close()
+
+
+def test_truncated_record_is_dropped(path):
+    journal = FeatureJournal(path)
+    journal.append('http://a.example/', {'url_len': 18})
+    journal.close()
+    with open(path, 'ab') as file:
+        file.write(b'{"url": "http://b.example/", "feat')
+
+    journal = FeatureJournal(path)
+    assert len(journal) == 1 and not journal.is_fresh('http://b.example/')
+    journal.append('http://c.example/', {'url_len': 18})
+    journal.close()
+
+    journal = FeatureJournal(path)
+    assert journal.get('http://c.example/') == {'url_len': 18}
+    journal.close()
+
+
+@pytest.mark.parametrize('features', [
+    {},
+    {'url_len': 18, 'has_robots': 0, feature_registry.MISSING_FEATURES: ['has_robots']},
+    {'url_len': 18, feature_registry.PAGE_ERROR: 'connection refused'},
+])
+def test_incomplete_extractions_are_retried(path, features):
+    assert not is_complete(features)
+    journal = FeatureJournal(path)
+    journal.append('http://a.example/', features)
+    journal.close()
+
+    journal = FeatureJournal(path)
+    assert not journal.is_fresh('http://a.example/')
+    assert journal.get('http://a.example/') == features
+    journal.append('http://a.example/', {'url_len': 18})
+    assert journal.is_fresh('http://a.example/')
+    journal.close()
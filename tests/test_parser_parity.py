@@ -0,0 +1,85 @@
+# tests/test_parser_parity.py
+import os
+
+import pytest
+import requests
+
+import feature_registry
+import page_stats
+from feature_extraction import URLFeatureExtractor
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+PAGES = sorted(name for name in os.listdir(FIXTURES) if name.endswith('.html'))
+URL = 'https://www.example.com/index.html'
+
+# Features computed from the URL and the page alone, without any other network probe
+PAGE_FEATURES = [spec.name for spec in feature_registry.FEATURES if set(spec.requires) <= {'fetch', 'parse'}]
+
+
+def read_page(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+def page_response(body):
+    response = requests.models.Response()
+    response.status_code = 200
+    response.url = URL
+    response.encoding = 'utf-8'
+    response._content = body
+    return response
+
+
+def extract(body, parser, chunk_size=None):
+    """
+    Extracts the page features of a fixture page with the given backend, parsing the
+    whole body or, with chunk_size, streaming it in chunks as a download would.
+    """
+    extractor = URLFeatureExtractor(URL, parser=parser)
+    response = page_response(body)
+    stream = None
+    if chunk_size is not None:
+        stream = page_stats.PageStream(parser)
+        stream.start(response)
+        for start in range(0, len(body), chunk_size):
+            stream.feed(body[start:start + chunk_size])
+    extractor.set_response(response, stream)
+    return extractor.extract_url_features(PAGE_FEATURES)
+
+
+def available(parser):
+    if parser == 'lxml':
+        pytest.importorskip('lxml')
+    elif parser == 'selectolax':
+        pytest.importorskip('selectolax')
+    return parser
+
+
+@pytest.mark.parametrize('page', PAGES)
+@pytest.mark.parametrize('parser', ['lxml', 'selectolax'])
+def test_backends_extract_identical_features(page, parser):
+    body = read_page(page)
+    expected = extract(body, 'html.parser')
+    features = extract(body, available(parser))
+    assert set(expected) == set(PAGE_FEATURES)
+    if parser == 'selectolax':
+        # lexbor drops or merges whitespace-only text around <html> and <body>, as
+        # HTML5 specifies, which moves the visible text length by a few characters
+        assert features.pop('content_richness') == pytest.approx(expected.pop('content_richness'), abs=0.01)
+    assert features == expected
+
+
+@pytest.mark.parametrize('page', PAGES)
+@pytest.mark.parametrize('parser', page_stats.PARSERS)
+def test_streamed_parse_matches_whole_page(page, parser):
+    body = read_page(page)
+    expected = extract(body, available(parser))
+    for chunk_size in (1, 7, 4096):
+        assert extract(body, parser, chunk_size) == expected
+
+
+@pytest.mark.parametrize('parser', page_stats.PARSERS)
+def test_implied_elements_are_not_counted(parser):
+    # lxml and lexbor insert <html>, <head>, <body> and <tbody> here; html.parser does not
+    stats = page_stats.parse_page('<title>Rates</title><table><tr><td>1</td></tr></table>', available(parser))
+    assert stats.tag_count == 4
@@ -0,0 +1,89 @@
+# tests/test_sharding.py
+import csv
+from collections import Counter
+
+import pytest
+import tldextract
+
+import sharding
+from web_crawler import iter_urls, shard_of
+
+URLS = [f"http://{host}/page-{number}.html"
+        for number in range(6) for host in ('a.example.com', 'www.b.example.org', 'c.example.net', 'b.example.org')]
+
+
+@pytest.fixture
+def feed(tmp_path):
+    path = tmp_path / 'urls.csv'
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['url'])
+        writer.writerows([url] for url in URLS)
+    return str(path)
+
+
+@pytest.mark.parametrize('shard_by', ['domain', 'line'])
+def test_shards_partition_the_feed(feed, shard_by):
+    rows = [row for shard_index in range(3)
+            for row in iter_urls(feed, shards=3, shard_index=shard_index, shard_by=shard_by, with_index=True)]
+    assert sorted(rows) == list(enumerate(URLS))
+
+
+def test_domain_shards_keep_a_domain_together(feed):
+    shards = {}
+    for shard_index in range(3):
+        for url in iter_urls(feed, shards=3, shard_index=shard_index):
+            domain_info = tldextract.extract(url)
+            shards.setdefault(f"{domain_info.domain}.{domain_info.suffix}", set()).add(shard_index)
+    assert set(shards) == {'example.com', 'example.org', 'example.net'}
+    assert all(len(indices) == 1 for indices in shards.values())
+    assert shard_of('http://www.b.example.org/x', 3) == shard_of('https://b.example.org/y', 3)
+
+
+def test_line_shards_take_every_nth_row(feed):
+    rows = list(iter_urls(feed, shards=3, shard_index=1, shard_by='line', with_index=True))
+    assert [index for index, _ in rows] == list(range(1, len(URLS), 3))
+
+
+@pytest.mark.parametrize('shard_by', ['domain', 'line'])
+def test_run_shard_uses_the_shard_assignment(feed, tmp_path, monkeypatch, shard_by):
+    received = []
+
+    def run_pipeline(urls, features_csv, results_csv, **options):
+        received.extend(urls)
+        return Counter()
+
+    monkeypatch.setattr(sharding, 'run_pipeline', run_pipeline)
+    sharding.run_shard(feed, 1, 3, str(tmp_path / 'shards'), shard_by=shard_by)
+    assert received == list(iter_urls(feed, shards=3, shard_index=1, shard_by=shard_by, with_index=True))
+
+
+def write_shard(path, rows):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['index', 'url', 'predicted_label'])
+        writer.writerows(rows)
+
+
+def test_merge_restores_feed_order(tmp_path):
+    shard_dir = str(tmp_path)
+    shard_rows = [[(0, 'u0', 'ham'), (3, 'u3', 'spam'), (10, 'u10', 'ham')],
+                  [(1, 'u1', 'ham'), (2, 'u2', 'ham')],
+                  []]
+    for shard_index, rows in enumerate(shard_rows):
+        for path in sharding.shard_paths(shard_dir, shard_index, 3):
+            write_shard(path, rows)
+    features_csv, results_csv = str(tmp_path / 'features.csv'), str(tmp_path / 'results.csv')
+
+    assert sharding.merge_shards(3, shard_dir, features_csv, results_csv) == 5
+    with open(results_csv, newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows == [['url', 'predicted_label'], ['u0', 'ham'], ['u1', 'ham'], ['u2', 'ham'], ['u3', 'spam'],
+                    ['u10', 'ham']]
+
+
+def test_merge_reports_missing_shards(tmp_path):
+    for path in sharding.shard_paths(str(tmp_path), 0, 2):
+        write_shard(path, [])
+    with pytest.raises(FileNotFoundError):
+        sharding.merge_shards(2, str(tmp_path), str(tmp_path / 'f.csv'), str(tmp_path / 'r.csv'))
@@ -0,0 +1,153 @@
+# url_screen.py
+import math
+import re
+from urllib.parse import urlparse
+
+import joblib
+import pandas as pd
+import tldextract
+
+from feature_extraction import has_unusual_symbols, url_length
+
+# Lexical features: computed from the URL string alone, without any I/O.
+LEXICAL_FEATURES = ['url_len', 'url_unusual_symbols', 'has_ip_host', 'has_at_symbol', 'subdomain_depth',
+                    'host_hyphens', 'digit_ratio', 'is_https_scheme', 'suspicious_words']
+
+SUSPICIOUS_WORDS = re.compile(r'login|signin|verify|account|update|secure|banking|confirm|password|wallet',
+                              re.IGNORECASE)
+IP_HOST = re.compile(r'^\d{1,3}(\.\d{1,3}){3}$')
+
+# Logistic weights of the built-in screen. They are hand-set so that only clear-cut
+# URLs fall outside the default thresholds; pass a trained model for real screening.
+DEFAULT_WEIGHTS = {
+    'url_len': 0.015,
+    'url_unusual_symbols': 1.5,
+    'has_ip_host': 3.0,
+    'has_at_symbol': 2.5,
+    'subdomain_depth': 0.6,
+    'host_hyphens': 0.8,
+    'digit_ratio': 4.0,
+    'is_https_scheme': -0.8,
+    'suspicious_words': 1.2,
+}
+DEFAULT_BIAS = -3.5
+
+# Default thresholds for a trained screen model: spam scores at or below DEFAULT_LOW
+# are classified ham without extraction, scores at or above DEFAULT_HIGH spam.
+# Lexical heuristics cannot tell a typosquat from the domain it imitates, so nothing
+# is screened as ham unless a lower bound is given. The built-in weights are not
+# trusted to decide spam on their own either: without a model, URLs are only
+# screened as spam if a high threshold is given.
+DEFAULT_LOW = 0.0
+DEFAULT_HIGH = 0.95
+
+
+def lexical_features(url):
+    """
+    Computes the lexical features of a URL.
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        dict: Value of every name in LEXICAL_FEATURES.
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    domain_info = tldextract.extract(url)
+    subdomains = [label for label in domain_info.subdomain.split('.') if label and label != 'www']
+    return {
+        # Computed as the extractor computes the model's features of the same name
+        'url_len': url_length(url),
+        'url_unusual_symbols': has_unusual_symbols(url),
+        'has_ip_host': 1 if IP_HOST.match(host) else 0,
+        'has_at_symbol': 1 if '@' in url else 0,
+        'subdomain_depth': len(subdomains),
+        'host_hyphens': host.count('-'),
+        'digit_ratio': round(sum(c.isdigit() for c in url) / len(url), 3) if url else 0,
+        'is_https_scheme': 1 if parsed.scheme.lower() == 'https' else 0,
+        'suspicious_words': len(SUSPICIOUS_WORDS.findall(url)),
+    }
+
+
+class URLScreen:
+    """
+    First stage of the cascade: scores a URL from its lexical features and decides
+    it when the score is confidently low or high. Only URLs in the uncertain band
+    between the thresholds need the full network-bound extraction and the model.
+
+    Args:
+        model_path (str): Optional classifier trained on LEXICAL_FEATURES (a joblib
+            file with predict_proba, class 1 = spam). The built-in logistic weights
+            are used when omitted.
+        low (float): Spam score at or below which a URL is classified ham
+            (DEFAULT_LOW if None).
+        high (float): Spam score at or above which a URL is classified spam. If None,
+            DEFAULT_HIGH with a model; without one, no URL is screened as spam.
+
+    Raises ValueError if the thresholds are out of order, or if neither a model nor a
+    threshold is given (the built-in weights would then decide no URL).
+    """
+
+    def __init__(self, model_path=None, low=None, high=None):
+        if low is None:
+            low = DEFAULT_LOW
+        if high is None and model_path:
+            high = DEFAULT_HIGH
+        if not 0 <= low <= (1 if high is None else high) <= 1:
+            raise ValueError(f"Screen thresholds must satisfy 0 <= low <= high <= 1, got {low} and {high}")
+        if not model_path and not low and high is None:
+            # The built-in weights decide no URL with the default thresholds
+            raise ValueError("The URL screen needs a model, or a low or high threshold for the built-in weights")
+        self.low = low
+        self.high = high
+        self.model = None
+        if model_path:
+            print(f"[INFO] Loading URL screen model from {model_path}...")
+            self.model = joblib.load(model_path)
+
+    def score(self, url):
+        """
+        Returns the probability that the URL is spam, from its lexical features.
+        """
+        features = lexical_features(url)
+        if self.model is not None:
+            columns = getattr(self.model, 'feature_names_in_', LEXICAL_FEATURES)
+            probabilities = self.model.predict_proba(pd.DataFrame([features])[columns])[0]
+            return float(probabilities[list(self.model.classes_).index(1)])
+        logit = DEFAULT_BIAS + sum(DEFAULT_WEIGHTS[name] * value for name, value in features.items())
+        return 1 / (1 + math.exp(-logit))
+
+    def decide(self, url):
+        """
+        Returns "ham" or "spam" when the score is outside the uncertain band, else None.
+        """
+        score = self.score(url)
+        if score <= self.low:
+            return "ham"
+        if self.high is not None and score >= self.high:
+            return "spam"
+        return None
+
+
+def screen_urls(urls, screen):
+    """
+    Runs the screen over a list of URLs.
+
+    Returns:
+        tuple: (labels, uncertain) where labels holds the screen's label for every
+            input URL (None where it was uncertain) and uncertain lists the URLs left
+            for full extraction, in input order.
+    """
+    labels = []
+    uncertain = []
+    for url in urls:
+        try:
+            label = screen.decide(url)
+        except Exception as e:
+            print(f"[ERROR] URL screen failed for {url}: {e}")
+            label = None
+        labels.append(label)
+        if label is None:
+            uncertain.append(url)
+    return labels, uncertain
@@ -1,17 +1,124 @@
 # web_crawler.py
+import bz2
 import csv
+import gzip
+import hashlib
+import lzma
+from itertools import islice
+from urllib.parse import urlsplit, urlunsplit
+
+import tldextract
+
+READ_BUFFER_BYTES = 1024 * 1024
+
+COMPRESSED_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def open_input(path):
+    """
+    Opens a URL feed for buffered text reading, decompressing .gz, .bz2 and .xz files on the fly.
+    """
+    for extension, opener in COMPRESSED_OPENERS.items():
+        if path.endswith(extension):
+            return opener(path, "rt", newline="")
+    return open(path, "r", newline="", buffering=READ_BUFFER_BYTES)
+
+def normalize_url(url):
+    """
+    Normalizes a URL: lowercase scheme and host, no default port, no fragment, and
+    "/" for an empty path.
+    """
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or '').rstrip('.')
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.scheme or not host:
+        return url
+    scheme = parts.scheme.lower()
+    netloc = host
+    if ':' in host:
+        netloc = f"[{host}]"  # IPv6 literal
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username + (f":{parts.password}" if parts.password is not None else "")
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+def shard_of(url, shards):
+    """
+    Returns the shard (0 .. shards - 1) of a URL by a stable hash of its registered
+    domain, so all URLs of a domain land in the same shard in every process and run.
+    """
+    domain_info = tldextract.extract(url)
+    domain = f"{domain_info.domain}.{domain_info.suffix}" if domain_info.suffix else domain_info.domain
+    digest = hashlib.blake2b(domain.lower().encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shards
+
+def iter_urls(csv_file="testNewURLs.csv", dedupe=False, normalize=False, start=0, stop=None, shards=1,
+              shard_index=0, shard_by="domain", with_index=False):
+    """
+    Yields full URLs from a CSV file with a 'url' column, reading it lazily in large
+    buffered blocks, so the first URL is available immediately and memory stays
+    flat however large the feed is.
+
+    Args:
+        csv_file (str): Input CSV, optionally compressed (.gz, .bz2 or .xz).
+        dedupe (bool): Skip URLs already seen. Only an 8-byte digest per distinct
+            URL is remembered.
+        normalize (bool): Normalize URLs with normalize_url() (before deduplication).
+        start (int): Index of the first data row to read.
+        stop (int): Index of the data row to stop before (end of file by default).
+        shards (int): Split the feed into this many shards...
+        shard_index (int): ...and yield only this one (0-based).
+        shard_by (str): "domain" (stable hash of the registered domain, keeps a
+            domain's URLs together) or "line" (row index modulo shards).
+        with_index (bool): Yield (row index, url) pairs instead of URLs.
+
+    Yields:
+        str: URLs in file order.
+    """
+    if not 0 <= shard_index < shards:
+        raise ValueError(f"shard_index must be in 0..{shards - 1}, got {shard_index}")
+    if shard_by not in ("domain", "line"):
+        raise ValueError(f"shard_by must be 'domain' or 'line', got {shard_by!r}")
+    seen = set()
+    with open_input(csv_file) as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        if 'url' not in header:
+            raise KeyError(f"{csv_file} has no 'url' column")
+        column = header.index('url')
+        for index, row in enumerate(islice(reader, start, stop), start):
+            if column >= len(row):
+                continue
+            url = row[column].strip()  # Directly read the 'url' column
+            if not url:
+                continue
+            if shards > 1:
+                shard = index % shards if shard_by == "line" else shard_of(url, shards)
+                if shard != shard_index:
+                    continue
+            if normalize:
+                url = normalize_url(url)
+            if dedupe:
+                key = hashlib.blake2b(url.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+                if key in seen:
+                    continue
+                seen.add(key)
+            yield (index, url) if with_index else url
 
 def web_crawler(csv_file="testNewURLs.csv"):
     """
     Reads full URLs from a CSV file and returns them as a list.
     """
     print("[INFO] Reading URLs from CSV...")
-    urls = []
-    with open(csv_file, "r") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            url = row['url'].strip()  # Directly read the 'url' column
-            urls.append(url)
+    urls = list(iter_urls(csv_file))
     print(f"[INFO] Found {len(urls)} URLs.")
     return urls
 